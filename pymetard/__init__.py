@@ -1,10 +1,20 @@
 from pymetard.metar import (
+    consolidate_partitions,
     fetch_stations,
+    load_data_file,
     relative_humidity_from_dewpoint,
     saturation_vapor_pressure,
     AviationWeatherCenterMetarDownloader,
     DateRollingCsvDownloader,
+    FetchedResponse,
+    LatestObservations,
+    merge_data_dirs,
     MetarCsvDownloader,
+    MetarPipeline,
+    normalize_raw_metar,
+    RawResponseArchive,
+    replay_archive,
+    serve_latest_observations,
     Station,
     WeatherGovMetarDownloader,
 )
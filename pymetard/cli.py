@@ -1,17 +1,29 @@
 import math
 import os
+import signal
+import sys
 import time
 from datetime import datetime, timedelta
+from pathlib import Path
 
 import anylearn
 import click
 
 from pymetard import (
+    consolidate_partitions,
     fetch_stations,
     AviationWeatherCenterMetarDownloader,
+    LatestObservations,
+    merge_data_dirs,
+    MetarCsvDownloader,
+    MetarPipeline,
+    RawResponseArchive,
+    replay_archive,
+    serve_latest_observations,
     WeatherGovMetarDownloader,
 )
 from pymetard.logger import logger
+from pymetard.profiler import Profiler
 
 
 if os.environ.get('ANYLEARN_TASK_ID', None) is not None:
@@ -20,10 +32,90 @@ else:
     data_workspace = "./data"
 
 
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _profiler_tick(ctx):
+    if ctx.obj['profiler'] is not None:
+        ctx.obj['profiler'].tick()
+
+
 @click.group()
 @click.version_option()
-def main():
-    pass
+@click.option(
+    '--compression',
+    type=click.Choice(["gzip"]),
+    default=None,
+    help="Compression of daily data files, appended frame by frame.",
+)
+@click.option(
+    '--archive/--no-archive',
+    default=False,
+    help="Archive raw responses under the data workspace for replay.",
+)
+@click.option(
+    '--granularity',
+    type=click.Choice(["hourly", "daily", "monthly"]),
+    default="daily",
+    help="Period of UTC time covered by each data file.",
+)
+@click.option(
+    '--region',
+    type=click.Choice(["icao", "country"]),
+    default=None,
+    help="Also partition data files by ICAO region or country.",
+)
+@click.option(
+    '--profile',
+    type=click.IntRange(1),
+    default=None,
+    metavar="CYCLES",
+    help="Profile CPU and memory for this many cycles or chunks.",
+)
+@click.option(
+    '--profile-seconds',
+    type=click.FloatRange(0, min_open=True),
+    default=None,
+    help="Stop profiling after this many seconds at the latest.",
+)
+@click.option(
+    '--profile-dir',
+    default="./profiles",
+    help="Directory to save profiles in.",
+)
+@click.pass_context
+def main(
+    ctx,
+    compression,
+    archive,
+    granularity,
+    region,
+    profile,
+    profile_seconds,
+    profile_dir,
+):
+    ctx.ensure_object(dict)
+    ctx.obj['profiler'] = None
+    if profile is not None or profile_seconds is not None:
+        ctx.obj['profiler'] = Profiler(
+            output_dir=profile_dir,
+            command=ctx.invoked_subcommand,
+            params={'argv': sys.argv[1:]},
+            cycles=profile,
+            seconds=profile_seconds,
+        )
+        ctx.obj['profiler'].start()
+        # Also covers commands ending before the cycles are done
+        ctx.call_on_close(ctx.obj['profiler'].stop)
+    ctx.obj['compression'] = compression
+    ctx.obj['granularity'] = granularity
+    ctx.obj['region'] = region
+    ctx.obj['archive'] = None
+    if archive:
+        ctx.obj['archive'] = RawResponseArchive(
+            Path(data_workspace) / "archive"
+        )
 
 
 @main.command()
@@ -31,31 +123,69 @@ def main():
     '--hours',
     type=click.IntRange(0, 120),
     default=1,
-    help="Back hours to search on Aviation Weather Center.",
+    help="Max back hours to search on Aviation Weather Center, "
+    "later cycles only search back to the latest stored observation.",
 )
 @click.option(
     '--interval',
     default=600,
     help="Polling interval in seconds.",
 )
-def poll(hours, interval):
+@click.option(
+    '--latest-port',
+    type=int,
+    default=None,
+    help="Serve latest observations per station as JSON on this port.",
+)
+@click.option(
+    '--latest-host',
+    default="127.0.0.1",
+    help="Host to serve latest observations on.",
+)
+@click.pass_context
+def poll(ctx, hours, interval, latest_port, latest_host):
     stations = fetch_stations() # 9318 stations
+    latest = LatestObservations(stations)
+    latest_snapshot = Path(data_workspace) / "latest.npz"
+    if latest_snapshot.exists():
+        latest.load(latest_snapshot)
+    if latest_port is not None:
+        serve_latest_observations(latest, host=latest_host, port=latest_port)
     downloader = AviationWeatherCenterMetarDownloader(
         stations=stations,
         target_dir=data_workspace,
+        compression=ctx.obj['compression'],
+        latest=latest,
+        archive=ctx.obj['archive'],
+        granularity=ctx.obj['granularity'],
+        region=ctx.obj['region'],
     )
     # URL length limit ~8000
     # while each station = 4 digits code + 1 comma encoded in %2C
     CHUNK_SIZE = 1050
-    while True:
-        for i in range(0, len(stations.keys()), CHUNK_SIZE):
-            candidates = list(stations.values())[i:i+CHUNK_SIZE]
-            while not downloader.download1(
-                stations_to_search=candidates,
-                hours=hours,
-            ):
-                time.sleep(10)
-        time.sleep(interval)
+    # Stop on SIGTERM like on Ctrl-C, so buffered rows are written
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    pipeline = MetarPipeline(downloader)
+    pipeline.start()
+    try:
+        while True:
+            for i in range(0, len(stations.keys()), CHUNK_SIZE):
+                candidates = list(stations.values())[i:i+CHUNK_SIZE]
+                pipeline.submit(
+                    stations_to_search=candidates,
+                    hours=downloader.incremental_hours(candidates, hours),
+                    incremental=True,
+                )
+            pipeline.join()
+            latest.save(latest_snapshot)
+            _profiler_tick(ctx)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Stopping, writing buffered data")
+    finally:
+        latest.save(latest_snapshot)
+        # Raises if buffered rows could not be written
+        pipeline.close()
 
 
 @main.command()
@@ -70,11 +200,16 @@ def poll(hours, interval):
     default=120,
     help="Back hours to search on Aviation Weather Center.",
 )
-def fill(from_datetime, hours):
+@click.pass_context
+def fill(ctx, from_datetime, hours):
     stations = fetch_stations() # 9318 stations
     downloader = AviationWeatherCenterMetarDownloader(
         stations=stations,
         target_dir=data_workspace,
+        compression=ctx.obj['compression'],
+        archive=ctx.obj['archive'],
+        granularity=ctx.obj['granularity'],
+        region=ctx.obj['region'],
     )
     # Too much content will cause AWC to return 500
     CHUNK_SIZE = 100
@@ -88,6 +223,7 @@ def fill(from_datetime, hours):
         ):
             time.sleep(10)
         logger.info(f"Downloaded {int(1+i/CHUNK_SIZE)}/{N}")
+        _profiler_tick(ctx)
         time.sleep(10)
 
 
@@ -100,7 +236,8 @@ def fill(from_datetime, hours):
     '--end',
     help="End datetime in format %Y%m%d%H%M.",
 )
-def batch(start, end):
+@click.pass_context
+def batch(ctx, start, end):
     start = datetime.strptime(start, "%Y%m%d%H%M")
     end = datetime.strptime(end, "%Y%m%d%H%M")
     if start > end:
@@ -110,6 +247,10 @@ def batch(start, end):
     downloader = WeatherGovMetarDownloader(
         stations=stations,
         target_dir=data_workspace,
+        compression=ctx.obj['compression'],
+        archive=ctx.obj['archive'],
+        granularity=ctx.obj['granularity'],
+        region=ctx.obj['region'],
     )
 
     CHUNK_SIZE = 500
@@ -141,6 +282,7 @@ def batch(start, end):
                 time.sleep(10)
             logger.info(f"Range {_start} to {_end}")
             logger.info(f"Downloaded {int(1+i/CHUNK_SIZE)}/{N}")
+            _profiler_tick(ctx)
             time.sleep(10)
         _start = _end + timedelta(minutes=1)
         if all([
@@ -159,5 +301,117 @@ def batch(start, end):
             )
 
 
+@main.command()
+@click.option(
+    '--source',
+    type=click.Choice(["awc", "weathergov"]),
+    default=None,
+    help="Only replay responses from this source.",
+)
+@click.option(
+    '--start',
+    default=None,
+    help="Replay responses fetched from this datetime in format %Y%m%d%H%M.",
+)
+@click.option(
+    '--end',
+    default=None,
+    help="Replay responses fetched until this datetime in format %Y%m%d%H%M.",
+)
+@click.option(
+    '--processes',
+    type=click.IntRange(1),
+    default=None,
+    help="Parser processes, defaults to the number of cores.",
+)
+@click.option(
+    '--target-dir',
+    default=None,
+    help="Directory to rebuild data files in, "
+    "defaults to the data workspace.",
+)
+@click.option(
+    '--replace/--no-replace',
+    default=False,
+    help="Replayed rows replace stored rows of the same report, "
+    "e.g. after a parser fix.",
+)
+@click.pass_context
+def replay(ctx, source, start, end, processes, target_dir, replace):
+    if start is not None:
+        start = datetime.strptime(start, "%Y%m%d%H%M")
+    if end is not None:
+        end = datetime.strptime(end, "%Y%m%d%H%M")
+    n_rows = replay_archive(
+        archive=RawResponseArchive(Path(data_workspace) / "archive"),
+        stations=fetch_stations(),
+        target_dir=target_dir or data_workspace,
+        compression=ctx.obj['compression'],
+        source=source,
+        start=start,
+        end=end,
+        processes=processes,
+        granularity=ctx.obj['granularity'],
+        region=ctx.obj['region'],
+        replace=replace,
+    )
+    logger.info(f"Replayed {n_rows} rows")
+
+
+@main.command()
+@click.option(
+    '--from',
+    'source_dirs',
+    multiple=True,
+    required=True,
+    help="Data directory to merge from, e.g. AWC and Weather.gov backfills. "
+    "Can be repeated.",
+)
+@click.pass_context
+def merge(ctx, source_dirs):
+    # Merging the workspace itself deduplicates its day files in place
+    n_rows = merge_data_dirs(
+        source_dirs=list(source_dirs),
+        target_dir=data_workspace,
+        fields=MetarCsvDownloader.FIELDS,
+        compression=ctx.obj['compression'],
+    )
+    logger.info(f"Merged {n_rows} new rows")
+
+
+@main.command(
+    help="Merge closed --granularity partitions into larger files. "
+    "Safe to run alongside poll, e.g. from cron: hot files poll appends "
+    "late reports to while consolidating are kept and merged again on "
+    "the next run. Set --before a few hours back to leave a margin for "
+    "late reports.",
+)
+@click.option(
+    '--to-granularity',
+    type=click.Choice(["daily", "monthly"]),
+    default="monthly",
+    help="Granularity of the consolidated data files.",
+)
+@click.option(
+    '--before',
+    default=None,
+    help="Only consolidate periods ending before this UTC datetime "
+    "in format %Y%m%d%H%M, defaults to now.",
+)
+@click.pass_context
+def consolidate(ctx, to_granularity, before):
+    if before is not None:
+        before = datetime.strptime(before, "%Y%m%d%H%M")
+    n_files = consolidate_partitions(
+        target_dir=data_workspace,
+        fields=MetarCsvDownloader.FIELDS,
+        from_granularity=ctx.obj['granularity'],
+        to_granularity=to_granularity,
+        before=before,
+        compression=ctx.obj['compression'],
+    )
+    logger.info(f"Consolidated {n_files} files")
+
+
 if __name__ == "__main__":
     main()
@@ -8,9 +8,40 @@ from pymetard.metar.meteo import (
     saturation_vapor_pressure,
 )
 
+from pymetard.metar.storage import (
+    load_data_file,
+)
+
+from pymetard.metar.archive import (
+    RawResponseArchive,
+)
+
+from pymetard.metar.merge import (
+    merge_data_dirs,
+    normalize_raw_metar,
+)
+
+from pymetard.metar.partition import (
+    consolidate_partitions,
+)
+
+from pymetard.metar.latest import (
+    LatestObservations,
+    serve_latest_observations,
+)
+
 from pymetard.metar.downloader import (
     AviationWeatherCenterMetarDownloader,
     DateRollingCsvDownloader,
+    FetchedResponse,
     MetarCsvDownloader,
     WeatherGovMetarDownloader,
 )
+
+from pymetard.metar.pipeline import (
+    MetarPipeline,
+)
+
+from pymetard.metar.replay import (
+    replay_archive,
+)
@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class RawResponseArchive:
+
+    FETCHED_AT_FORMAT: str = "%Y%m%dT%H%M%SZ"
+
+    def __init__(
+        self,
+        archive_dir: os.PathLike = "data/archive",
+    ):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(
+        self,
+        source: str,
+        params: Dict[str, str],
+        body: str,
+        fetched_at: Optional[datetime] = None,
+    ) -> Path:
+        if fetched_at is None:
+            fetched_at = datetime.utcnow()
+        fetched_at_str = fetched_at.strftime(self.FETCHED_AT_FORMAT)
+        # Address by what was fetched and when, so the same request
+        # archived twice maps to the same file
+        digest = hashlib.sha1(json.dumps(
+            [source, params, fetched_at_str],
+            sort_keys=True,
+            default=str,
+        ).encode('utf-8')).hexdigest()
+        save_dir = (
+            self.archive_dir
+            / source
+            / fetched_at.strftime("%Y")
+            / fetched_at.strftime("%m")
+            / fetched_at.strftime("%d")
+        )
+        save_dir.mkdir(parents=True, exist_ok=True)
+        file_path = save_dir / f"{fetched_at_str}-{digest[:16]}.json.gz"
+        entry = {
+            'source': source,
+            'params': params,
+            'fetched_at': fetched_at_str,
+            'body': body,
+        }
+        tmp_path = file_path.with_name(f"{file_path.name}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, file_path)
+        return file_path
+
+    def entries(
+        self,
+        source: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Path]:
+        root = self.archive_dir / source if source else self.archive_dir
+        entries = []
+        for file_path in sorted(root.glob("**/*.json.gz")):
+            fetched_at = datetime.strptime(
+                file_path.name.split("-")[0],
+                self.FETCHED_AT_FORMAT,
+            )
+            if start is not None and fetched_at < start:
+                continue
+            if end is not None and fetched_at > end:
+                continue
+            entries.append(file_path)
+        return entries
+
+    def load(self, file_path: os.PathLike) -> Dict:
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Archive entry {file_path} not found")
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            entry = json.load(f)
+        entry['fetched_at'] = datetime.strptime(
+            entry['fetched_at'],
+            self.FETCHED_AT_FORMAT,
+        )
+        return entry
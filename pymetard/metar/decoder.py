@@ -0,0 +1,226 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+
+# Fast path decoder for the few METAR fields stored in the CSV files.
+#
+# Only reports following a strict, unambiguous layout are decoded here:
+#   [METAR|SPECI] [COR] station time [modifier] wind [variable wind]
+#   visibility* runway* weather* sky* [temperature] pressure* [SLP]
+#   [trend ...] [RMK remarks...]
+# Groups are accepted only in this order and in forms which python-metar
+# (pinned in requirements.txt) interprets the same way, so both decoders
+# produce identical values. Anything else returns None and the caller
+# falls back to the full python-metar decoder.
+
+TYPES = {"METAR", "SPECI"}
+MODIFIERS = {
+    "AUTO", "COR", "RTD",
+    "CCA", "CCB", "CCC", "CCD", "CCE", "CCF", "CCG",
+}
+TRENDS = {"NOSIG", "TEMPO", "BECMG", "FCST"}
+REMARKS = {"RMK", "RMKS", "NOSPECI"}
+
+STATION_RE = re.compile(r"[A-Z][A-Z0-9]{3}")
+TIME_RE = re.compile(r"(\d\d)(\d\d)(\d\d)Z?")
+WIND_RE = re.compile(r"(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?KT")
+WIND_VARIATION_RE = re.compile(r"(\d{3})V(\d{3})")
+VISIBILITY_RE = re.compile(
+    r"\d{4}(?:NDV|[NSEW][EW]?)?|CAVOK|[MP]?\d{1,2}SM|[MP]?\d/\d{1,2}SM"
+)
+RUNWAY_RE = re.compile(
+    r"R\d\d[LRC]?/[MP]?\d{4}(?:V[MP]?\d{4})?(?:FT)?[/NDU]?"
+)
+WEATHER_RE = re.compile(
+    r"(?:[-+]|VC)?"
+    r"(?:MI|PR|BC|DR|BL|SH|TS|FZ)?"
+    r"(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP){0,3}"
+    r"(?:BR|FG|FU|VA|DU|SA|HZ|PY)?"
+    r"(?:PO|SQ|FC|SS|DS)?"
+)
+SKY_RE = re.compile(
+    r"(?:FEW|SCT|BKN|OVC)\d{3}(?:CB|TCU)?|VV\d{3}|CLR|SKC|NSC|NCD"
+)
+TEMP_RE = re.compile(r"((?:M|-)?\d{1,2})/((?:M|-)?\d{1,2}|//|XX|MM)?")
+PRESS_RE = re.compile(r"([AQ])(\d{4})")
+SEALVL_PRESS_RE = re.compile(r"SLP(\d{3})")
+TEMP_1HR_RE = re.compile(r"T([01])(\d{3})(?:([01])(\d{3}))?")
+
+# Groups between the wind and the temperature, the index of the matched
+# alternative gives the order python-metar expects them in
+BODY_RE = re.compile("|".join(
+    f"({r.pattern})"
+    for r in [VISIBILITY_RE, RUNWAY_RE, WEATHER_RE, SKY_RE]
+))
+
+
+@dataclass
+class MetarFields:
+    station_id: Optional[str]
+    time: Optional[datetime]
+    temp: Optional[float] = None # C
+    dewpt: Optional[float] = None # C
+    press: Optional[float] = None # MB
+    press_sea_level: Optional[float] = None # MB
+    wind_dir: Optional[float] = None # Degrees
+    wind_speed: Optional[float] = None # KT
+    wind_gust: Optional[float] = None # KT
+
+
+def _sanitize(metar_raw: str) -> List[str]:
+    return metar_raw.strip().rstrip("=").split()
+
+
+def _time(
+    day: int,
+    hour: int,
+    minute: int,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+) -> datetime:
+    # Same month/year guessing as python-metar
+    if month and year:
+        return datetime(year, month, day, hour, minute)
+    now = datetime.utcnow()
+    if not month:
+        month = now.month
+        if day > now.day:
+            month = 12 if month == 1 else month - 1
+    if not year:
+        year = now.year
+        if month > now.month:
+            year = year - 1
+        elif month == now.month and day > now.day:
+            year = year - 1
+    return datetime(year, month, day, hour, minute)
+
+
+def _temperature(value: str) -> float:
+    if value.startswith("M"):
+        return -float(value[1:])
+    return float(value)
+
+
+def _sea_level_pressure(value: str) -> float:
+    press = float(value) / 10.0
+    if press < 50:
+        return press + 1000
+    return press + 900
+
+
+def decode_metar(
+    metar_raw: str,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+) -> Optional[MetarFields]:
+    groups = _sanitize(metar_raw)
+    n = len(groups)
+    i = 0
+
+    # Header
+    if i < n and groups[i] in TYPES:
+        i += 1
+    if i < n and groups[i] == "COR":
+        i += 1
+    if i >= n or not STATION_RE.fullmatch(groups[i]):
+        return None
+    station_id = groups[i]
+    i += 1
+    m = TIME_RE.fullmatch(groups[i]) if i < n else None
+    if m is None:
+        return None
+    try:
+        time = _time(
+            int(m.group(1)),
+            int(m.group(2)),
+            int(m.group(3)),
+            year=year,
+            month=month,
+        )
+    except ValueError:
+        return None
+    i += 1
+    if i < n and groups[i] in MODIFIERS:
+        i += 1
+    fields = MetarFields(station_id=station_id, time=time)
+
+    # Wind
+    m = WIND_RE.fullmatch(groups[i]) if i < n else None
+    if m is None:
+        return None
+    if m.group(1) != "VRB":
+        fields.wind_dir = float(m.group(1))
+        if fields.wind_dir > 360:
+            return None
+    fields.wind_speed = float(m.group(2))
+    if m.group(3):
+        fields.wind_gust = float(m.group(3))
+    i += 1
+    m = WIND_VARIATION_RE.fullmatch(groups[i]) if i < n else None
+    if m is not None:
+        if float(m.group(1)) > 360 or float(m.group(2)) > 360:
+            return None
+        i += 1
+
+    # Visibility, runway, weather and sky groups are only skipped
+    stage = 1
+    while i < n:
+        m = BODY_RE.fullmatch(groups[i])
+        if m is None or m.lastindex < stage:
+            break
+        stage = m.lastindex
+        i += 1
+
+    # Temperature and pressure
+    m = TEMP_RE.fullmatch(groups[i]) if i < n else None
+    if m is not None:
+        fields.temp = _temperature(m.group(1))
+        dewpt = m.group(2)
+        if dewpt and dewpt not in ("//", "XX", "MM"):
+            fields.dewpt = _temperature(dewpt)
+        i += 1
+    while i < n:
+        m = PRESS_RE.fullmatch(groups[i])
+        if m is None:
+            break
+        if m.group(1) == "A":
+            fields.press = float(m.group(2)) / 100 * 33.86398
+        else:
+            fields.press = float(m.group(2))
+        i += 1
+    m = SEALVL_PRESS_RE.fullmatch(groups[i]) if i < n else None
+    if m is not None:
+        fields.press_sea_level = _sea_level_pressure(m.group(1))
+        i += 1
+
+    # Trend groups never carry the stored fields, skip up to the remarks
+    if i < n and groups[i] in TRENDS:
+        while i < n and groups[i] not in REMARKS:
+            i += 1
+    if i == n:
+        return fields
+    if groups[i] not in REMARKS:
+        return None
+    i += 1
+
+    # Remarks, the last group of each kind wins
+    for group in groups[i:]:
+        if group.startswith("SLP"):
+            m = SEALVL_PRESS_RE.fullmatch(group)
+            if m is not None:
+                fields.press_sea_level = _sea_level_pressure(m.group(1))
+            continue
+        if not group.startswith("T"):
+            continue
+        m = TEMP_1HR_RE.fullmatch(group)
+        if m is not None:
+            fields.temp = float(m.group(2)) / 10.0
+            if m.group(1) == "1":
+                fields.temp = -fields.temp
+            if m.group(4):
+                fields.dewpt = float(m.group(4)) / 10.0
+                if m.group(3) == "1":
+                    fields.dewpt = -fields.dewpt
+    return fields
@@ -1,9 +1,11 @@
 import abc
-import csv
+import json
+import math
 import os
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
 import requests
 from bs4 import BeautifulSoup
@@ -14,6 +16,47 @@ from pymetard.metar import (
     relative_humidity_from_dewpoint,
     Station,
 )
+from pymetard.metar.archive import RawResponseArchive
+from pymetard.metar.decoder import (
+    decode_metar,
+    MetarFields,
+)
+from pymetard.metar.latest import LatestObservations
+from pymetard.metar.merge import (
+    merge_data_file,
+    merge_rows,
+    SOURCE_PRIORITY,
+)
+from pymetard.metar.partition import (
+    check_granularity,
+    check_region,
+    partition_file_path,
+    partition_key,
+    station_region,
+    utc_datetime,
+    utc_timestamp,
+)
+from pymetard.metar.storage import (
+    append_data_file,
+    check_compression,
+    dump_data_file,
+    iter_data_file,
+)
+
+
+@dataclass
+class FetchedResponse:
+    params: Dict[str, str]
+    body: str
+    fetched_at: datetime
+    payload: Any = None # Decoded body, if decoded when fetching
+    incremental: bool = False
+    not_modified: bool = False
+    # Incremental state, committed once the parsed rows are written
+    request_key: Optional[str] = None
+    validators: Optional[Dict[str, str]] = None
+    seen_raw_metars: Optional[Set[str]] = None
+    observed_until: Optional[datetime] = None
 
 
 class DateRollingCsvDownloader(abc.ABC):
@@ -21,30 +64,51 @@ class DateRollingCsvDownloader(abc.ABC):
     def __init__(
         self,
         target_dir: os.PathLike = "data",
+        compression: Optional[str] = None,
+        granularity: str = "daily",
     ):
         super().__init__()
         self.target_dir = Path(target_dir)
         self.target_dir.mkdir(parents=True, exist_ok=True)
+        self.compression = check_compression(compression)
+        self.granularity = check_granularity(granularity)
         self.data = []
 
     def _dump_data(self):
         self.data = self._deduplicate_data(self.data)
-        data_by_date = self._group_data_by_date()
-        dates = sorted(data_by_date.keys())
+        data_by_partition = self._group_data_by_partition()
+        partitions = sorted(data_by_partition.keys())
         logger.warning(
             f"Downloader contains data from "
-            f"{len(dates)} days: "
-            f"{dates}"
+            f"{len(partitions)} partitions: "
+            f"{partitions}"
         )
         # Merge data with existing data and dump them
-        for date in dates:
-            data_file_path = self._ensure_data_file(date)
-            data = self._load_data_from_file(data_file_path)
-            data.extend(data_by_date[date])
-            data = self._deduplicate_data(data)
-            self._dump_data_in_file(data, data_file_path)
+        for partition in partitions:
+            data_file_path = self._ensure_data_file(partition)
+            self._merge_data_in_file(
+                data_by_partition[partition],
+                data_file_path,
+            )
         self.data = []
 
+    def _merge_data_in_file(
+        self,
+        data: List[Dict[str, str]],
+        file_path: os.PathLike,
+    ):
+        truncated = []
+        existing = self._load_data_from_file(
+            file_path,
+            on_truncated=lambda: truncated.append(file_path),
+        )
+        data = self._deduplicate_data(existing + data)
+        if not truncated and data[:len(existing)] == existing:
+            # Existing rows untouched, only append the new ones
+            self._append_data_in_file(data[len(existing):], file_path)
+        else:
+            self._dump_data_in_file(data, file_path)
+
     @abc.abstractmethod
     def _deduplicate_data(
         self,
@@ -53,19 +117,22 @@ class DateRollingCsvDownloader(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def _group_data_by_date(self) -> Dict[str, List[Dict[str, str]]]:
+    def _group_data_by_partition(self) -> Dict[str, List[Dict[str, str]]]:
         raise NotImplementedError
 
     def _ensure_data_file(
         self,
-        date: Optional[str] = None,
+        partition: Optional[str] = None,
     ) -> Path:
-        if not date:
-            date = datetime.utcnow().strftime("%Y%m%d")
-        datetime.strptime(date, "%Y%m%d") # Will raise if invalid
-        save_dir = self.target_dir / date[:4] / date[4:6]
-        save_dir.mkdir(parents=True, exist_ok=True)
-        data_file_path = save_dir / f"{date}.csv"
+        if not partition:
+            partition = partition_key(datetime.utcnow(), self.granularity)
+        # Will raise if invalid
+        data_file_path = partition_file_path(
+            self.target_dir,
+            partition,
+            self.compression,
+        )
+        data_file_path.parent.mkdir(parents=True, exist_ok=True)
         if not data_file_path.exists():
             data_file_path.touch()
         return data_file_path
@@ -73,29 +140,35 @@ class DateRollingCsvDownloader(abc.ABC):
     def _load_data_from_file(
         self,
         file_path: os.PathLike,
+        on_truncated: Optional[Callable[[], None]] = None,
     ) -> List[Dict[str, str]]:
-        file_path = Path(file_path)
-        if not file_path.exists():
-            raise FileNotFoundError(f"File {file_path} not found")
-        with file_path.open('r') as f:
-            reader = csv.DictReader(f, delimiter=',')
-            return list(reader)
+        return list(iter_data_file(file_path, on_truncated=on_truncated))
 
     def _dump_data_in_file(
         self,
         data: List[Dict[str, str]],
         file_path: os.PathLike,
     ):
-        file_path = Path(file_path)
-        with file_path.open('w') as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=self._get_csv_fields(),
-                delimiter=',',
-            )
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
+        dump_data_file(
+            data,
+            file_path,
+            fields=self._get_csv_fields(),
+            compression=self.compression,
+        )
+
+    def _append_data_in_file(
+        self,
+        data: List[Dict[str, str]],
+        file_path: os.PathLike,
+    ):
+        if not data:
+            return
+        append_data_file(
+            data,
+            file_path,
+            fields=self._get_csv_fields(),
+            compression=self.compression,
+        )
 
     @abc.abstractmethod
     def _get_csv_fields(self) -> List[str]:
@@ -104,6 +177,8 @@ class DateRollingCsvDownloader(abc.ABC):
 
 class MetarCsvDownloader(DateRollingCsvDownloader):
 
+    SOURCE: str = "metar"
+
     FIELDS: List[str] = [
         'timestamp',
         'name', 'code', 'lng', 'lat', 'ele', # Station info
@@ -111,15 +186,31 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
         'pressure_mb', 'pressuresea_mb', # Pressure
         'winddirection_deg', 'windspeed_kt', 'windgust_kt', # Wind
         'rawmetar',
+        'source', # Downloader the row was parsed by
     ]
 
     def __init__(
         self,
         stations: Dict[str, Station],
         target_dir: os.PathLike = "data",
+        compression: Optional[str] = None,
+        latest: Optional[LatestObservations] = None,
+        archive: Optional[RawResponseArchive] = None,
+        granularity: str = "daily",
+        region: Optional[str] = None,
+        replace: bool = False,
     ):
-        super().__init__(target_dir=target_dir)
+        super().__init__(
+            target_dir=target_dir,
+            compression=compression,
+            granularity=granularity,
+        )
         self.stations = stations
+        self.latest = latest
+        self.archive = archive
+        self.region = check_region(region)
+        # Rows replace stored ones of the same report on ties
+        self.replace = replace
 
     def _get_csv_fields(self) -> List[str]:
         return self.FIELDS
@@ -128,21 +219,87 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
         self,
         data: List[Dict[str, str]],
     ) -> List[Dict[str, str]]:
-        dedup = {}
-        for row in data:
-            if row['rawmetar'] not in dedup:
-                dedup[row['rawmetar']] = row
-        return list(dedup.values())
-
-    def _group_data_by_date(self) -> Dict[str, List[Dict[str, str]]]:
-        data_by_date = {}
+        return merge_rows(data, priority=SOURCE_PRIORITY)
+
+    def _merge_data_in_file(
+        self,
+        data: List[Dict[str, str]],
+        file_path: os.PathLike,
+    ):
+        # Reads the day file once, rewrites it only if a stored row
+        # loses against a new one, otherwise appends
+        merge_data_file(
+            data,
+            file_path,
+            fields=self._get_csv_fields(),
+            compression=self.compression,
+            priority=SOURCE_PRIORITY,
+            replace=self.replace,
+        )
+
+    def _group_data_by_partition(self) -> Dict[str, List[Dict[str, str]]]:
+        data_by_partition = {}
         for row in self.data:
-            dt = datetime.fromtimestamp(float(row['timestamp']))
-            date = dt.strftime("%Y%m%d")
-            if date not in data_by_date:
-                data_by_date[date] = []
-            data_by_date[date].append(row)
-        return data_by_date
+            region = None
+            if self.region is not None:
+                region = station_region(
+                    self.stations[row['code']],
+                    self.region,
+                )
+            partition = partition_key(
+                self._observed_at(row),
+                self.granularity,
+                region,
+            )
+            if partition not in data_by_partition:
+                data_by_partition[partition] = []
+            data_by_partition[partition].append(row)
+        return data_by_partition
+
+    def fetch1(self, *args, **kwargs) -> Optional[FetchedResponse]:
+        raise NotImplementedError
+
+    def parse_response(
+        self,
+        response: FetchedResponse,
+    ) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def replay_response(
+        self,
+        body: str,
+        params: Dict[str, str],
+        fetched_at: datetime,
+    ) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def commit_response(self, response: FetchedResponse):
+        pass
+
+    def _download(self, response: Optional[FetchedResponse]) -> bool:
+        if response is None:
+            return False
+        for data in self.parse_response(response):
+            self._collect_data(data)
+        if self.data:
+            self._dump_data()
+        self.commit_response(response)
+        return True
+
+    def _archive_response(
+        self,
+        params: Dict[str, str],
+        body: str,
+        fetched_at: datetime,
+    ):
+        if self.archive is None:
+            return
+        self.archive.save(self.SOURCE, params, body, fetched_at)
+
+    def _collect_data(self, data: Dict[str, str]):
+        self.data.append(data)
+        if self.latest is not None:
+            self.latest.update(data)
 
     def _fetch_data_from_raw_metar(
         self,
@@ -152,12 +309,7 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
     ) -> Optional[Dict[str, str]]:
         logger.debug(f"Parsing raw METAR: {metar_raw}")
         metar_raw = self._clean_raw_metar(metar_raw)
-        metar_decoded = Metar.Metar(
-            metar_raw,
-            year=year,
-            month=month,
-            strict=False,
-        )
+        metar_decoded = self._decode_metar(metar_raw, year=year, month=month)
         station = self.stations[metar_decoded.station_id]
         if not self._metar_valid(metar_decoded):
             logger.debug(
@@ -167,21 +319,22 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
             return None
 
         data = {
-            'timestamp': metar_decoded.time.timestamp(),
+            'timestamp': utc_timestamp(metar_decoded.time),
             'name': station.name,
             'code': station.code4,
             'lng': station.longitude,
             'lat': station.latitude,
             'ele': station.elevation,
-            'temperature_c': self._temperature(metar_decoded),
-            'dewpoint_c': self._dewpoint(metar_decoded),
+            'temperature_c': metar_decoded.temp,
+            'dewpoint_c': metar_decoded.dewpt,
             'relativehumidity': self._relative_humidity(metar_decoded),
-            'pressure_mb': self._pressure(metar_decoded),
-            'pressuresea_mb': self._pressure_sea(metar_decoded),
-            'winddirection_deg': self._wind_direction(metar_decoded),
-            'windspeed_kt': self._wind_speed(metar_decoded),
-            'windgust_kt': self._wind_gust(metar_decoded),
+            'pressure_mb': metar_decoded.press,
+            'pressuresea_mb': metar_decoded.press_sea_level,
+            'winddirection_deg': metar_decoded.wind_dir,
+            'windspeed_kt': metar_decoded.wind_speed,
+            'windgust_kt': metar_decoded.wind_gust,
             'rawmetar': metar_raw,
+            'source': self.SOURCE,
         }
         logger.debug(
             f"[{station.code4}] Fetched data: "
@@ -196,10 +349,69 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
 
         return data
 
+    def _observed_at(self, data: Dict[str, str]) -> datetime:
+        return utc_datetime(data['timestamp'])
+
+    def _fetch_data_from_raw_metars(
+        self,
+        raw_metars: List[str],
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        failed: Optional[List[str]] = None,
+    ) -> List[Dict[str, str]]:
+        data_list = []
+        for raw_metar in raw_metars:
+            try:
+                data = self._fetch_data_from_raw_metar(
+                    raw_metar,
+                    year=year,
+                    month=month,
+                )
+            except Exception as e:
+                logger.error(
+                    "[FATAL] "
+                    f"Failed to parse raw METAR {raw_metar}. "
+                    f"Error: {e}"
+                )
+                if failed is not None:
+                    failed.append(raw_metar)
+                continue
+            if data is not None:
+                data_list.append(data)
+        return data_list
+
     def _clean_raw_metar(self, metar_raw: str) -> str:
         return metar_raw.replace("\x00", "")
 
-    def _metar_valid(self, metar: Metar.Metar) -> bool:
+    def _decode_metar(
+        self,
+        metar_raw: str,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+    ) -> MetarFields:
+        fields = decode_metar(metar_raw, year=year, month=month)
+        if fields is not None:
+            return fields
+        # Not decodable with confidence on the fast path
+        metar = Metar.Metar(
+            metar_raw,
+            year=year,
+            month=month,
+            strict=False,
+        )
+        return MetarFields(
+            station_id=metar.station_id,
+            time=metar.time,
+            temp=self._temperature(metar),
+            dewpt=self._dewpoint(metar),
+            press=self._pressure(metar),
+            press_sea_level=self._pressure_sea(metar),
+            wind_dir=self._wind_direction(metar),
+            wind_speed=self._wind_speed(metar),
+            wind_gust=self._wind_gust(metar),
+        )
+
+    def _metar_valid(self, metar: MetarFields) -> bool:
         return metar.time is not None
 
     def _temperature(self, metar: Metar.Metar) -> Optional[float]:
@@ -212,13 +424,10 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
             return None
         return metar.dewpt.value(units="C")
 
-    def _relative_humidity(self, metar: Metar.Metar) -> Optional[float]:
+    def _relative_humidity(self, metar: MetarFields) -> Optional[float]:
         if metar.temp is None or metar.dewpt is None:
             return None
-        return relative_humidity_from_dewpoint(
-            metar.temp.value(units="C"),
-            metar.dewpt.value(units="C"),
-        )
+        return relative_humidity_from_dewpoint(metar.temp, metar.dewpt)
 
     def _pressure(self, metar: Metar.Metar) -> Optional[float]:
         if metar.press is None:
@@ -248,19 +457,73 @@ class MetarCsvDownloader(DateRollingCsvDownloader):
 
 class AviationWeatherCenterMetarDownloader(MetarCsvDownloader):
 
+    SOURCE: str = "awc"
+
+    # Extra look-back before the latest stored observation, covers late
+    # and corrected reports
+    INCREMENTAL_MARGIN: timedelta = timedelta(minutes=30)
+
     def __init__(
         self,
         stations: Dict[str, Station],
         target_dir: os.PathLike = "data",
+        compression: Optional[str] = None,
+        latest: Optional[LatestObservations] = None,
+        archive: Optional[RawResponseArchive] = None,
+        granularity: str = "daily",
+        region: Optional[str] = None,
     ):
-        super().__init__(stations, target_dir)
+        super().__init__(
+            stations,
+            target_dir,
+            compression,
+            latest,
+            archive,
+            granularity,
+            region,
+        )
+        # Incremental polling state, by station ids of each request
+        self.high_water_marks: Dict[str, datetime] = {}
+        self.last_raw_metars: Dict[str, Set[str]] = {}
+        self.validators: Dict[str, Dict[str, str]] = {}
+
+    def incremental_hours(
+        self,
+        stations_to_search: List[Station],
+        max_hours: int,
+    ) -> int:
+        ids = ",".join([s.code4 for s in stations_to_search])
+        if ids not in self.high_water_marks:
+            return max_hours
+        window = (
+            datetime.utcnow()
+            - self.high_water_marks[ids]
+            + self.INCREMENTAL_MARGIN
+        )
+        hours = math.ceil(window.total_seconds() / 3600)
+        return min(max_hours, max(1, hours))
 
     def download1(
         self,
         stations_to_search: List[Station],
         from_datetime: Optional[datetime] = None,
         hours: int = 0,
+        incremental: bool = False,
     ) -> bool:
+        return self._download(self.fetch1(
+            stations_to_search=stations_to_search,
+            from_datetime=from_datetime,
+            hours=hours,
+            incremental=incremental,
+        ))
+
+    def fetch1(
+        self,
+        stations_to_search: List[Station],
+        from_datetime: Optional[datetime] = None,
+        hours: int = 0,
+        incremental: bool = False,
+    ) -> Optional[FetchedResponse]:
         base_url = "https://www.aviationweather.gov/metar/data"
         params = {
             'ids': ",".join([s.code4 for s in stations_to_search]),
@@ -272,8 +535,14 @@ class AviationWeatherCenterMetarDownloader(MetarCsvDownloader):
         if isinstance(from_datetime, datetime):
             params['date'] = from_datetime.strftime("%Y%m%d%H%M")
 
+        request_key = json.dumps(params, sort_keys=True)
+        headers = {}
+        if incremental and request_key in self.validators:
+            headers = self.validators[request_key]
+
         try:
-            res = requests.get(base_url, params=params)
+            fetched_at = datetime.utcnow()
+            res = requests.get(base_url, params=params, headers=headers)
             res.raise_for_status()
         except requests.exceptions.HTTPError as e:
             logger.error(
@@ -282,33 +551,165 @@ class AviationWeatherCenterMetarDownloader(MetarCsvDownloader):
                 f"Status code: {e.response.status_code}."
                 f"Error: {e}"
             )
-            return False
+            return None
         except requests.exceptions.ConnectionError as e:
             logger.error(
                 f"Failed to connect to {base_url} "
                 f"with params {params}. "
                 f"Error: {e}"
             )
-            return False
+            return None
 
-        soup = BeautifulSoup(res.text, 'html.parser')
-        for element in soup.find_all('code'):
-            data = self._fetch_data_from_raw_metar(element.text)
-            if data is not None:
-                self.data.append(data)
-        self._dump_data()
+        if res.status_code == 304:
+            logger.info(f"No new METAR for {len(stations_to_search)} stations")
+            return FetchedResponse(
+                params=params,
+                body="",
+                fetched_at=fetched_at,
+                incremental=incremental,
+                not_modified=True,
+            )
 
-        return True
+        self._archive_response(params, res.text, fetched_at)
+        return FetchedResponse(
+            params=params,
+            body=res.text,
+            fetched_at=fetched_at,
+            incremental=incremental,
+            request_key=request_key,
+            validators=self._validators(res) if incremental else None,
+        )
+
+    def parse_response(
+        self,
+        response: FetchedResponse,
+    ) -> List[Dict[str, str]]:
+        if response.not_modified:
+            return []
+        ids = response.params['ids']
+        raw_metars = self._raw_metars_from_response(response.body)
+        if response.incremental:
+            # Reports already stored by the previous cycle are not reparsed
+            last_raw_metars = self.last_raw_metars.get(ids, set())
+            response.seen_raw_metars = {
+                r for r in raw_metars if r in last_raw_metars
+            }
+            raw_metars = [r for r in raw_metars if r not in last_raw_metars]
+        # One bad report, e.g. from an unknown station, only skips itself
+        failed = []
+        data_list = self._fetch_data_from_raw_metars(
+            raw_metars,
+            failed=failed,
+        )
+        if response.incremental:
+            response.seen_raw_metars.update(
+                r for r in raw_metars if r not in failed
+            )
+            if data_list:
+                response.observed_until = max(
+                    self._observed_at(data) for data in data_list
+                )
+            if failed:
+                # Refetched in full next time, failed reports are retried
+                response.validators = None
+        logger.info(
+            f"Parsed {len(raw_metars)} new METAR "
+            f"for {len(ids.split(','))} stations"
+        )
+        return data_list
+
+    def replay_response(
+        self,
+        body: str,
+        params: Dict[str, str],
+        fetched_at: datetime,
+    ) -> List[Dict[str, str]]:
+        reference = fetched_at
+        if 'date' in params:
+            reference = datetime.strptime(params['date'], "%Y%m%d%H%M")
+        if reference.month == 1:
+            previous = (reference.year - 1, 12)
+        else:
+            previous = (reference.year, reference.month - 1)
+        data_list = []
+        for raw_metar in self._raw_metars_from_response(body):
+            data = self._fetch_data_from_raw_metars(
+                [raw_metar],
+                year=reference.year,
+                month=reference.month,
+            )
+            # METAR only carries the day of month, which belongs to the
+            # previous month when it comes after the fetch date
+            late = reference + timedelta(days=1)
+            if not data or self._observed_at(data[0]) > late:
+                data = self._fetch_data_from_raw_metars(
+                    [raw_metar],
+                    year=previous[0],
+                    month=previous[1],
+                )
+            data_list.extend(data)
+        return data_list
+
+    def _raw_metars_from_response(self, body: str) -> List[str]:
+        soup = BeautifulSoup(body, 'html.parser')
+        return [element.text for element in soup.find_all('code')]
+
+    def commit_response(self, response: FetchedResponse):
+        # Only called once the parsed rows are written, so reports lost
+        # to a failed parse or write are fetched and parsed again
+        if not response.incremental or response.not_modified:
+            return
+        ids = response.params['ids']
+        if response.seen_raw_metars is not None:
+            self.last_raw_metars[ids] = response.seen_raw_metars
+        if response.observed_until is not None:
+            self._update_high_water_mark(ids, response.observed_until)
+        if response.validators:
+            self.validators[response.request_key] = response.validators
+        else:
+            self.validators.pop(response.request_key, None)
+
+    def _validators(self, res: requests.Response) -> Dict[str, str]:
+        validators = {}
+        if 'ETag' in res.headers:
+            validators['If-None-Match'] = res.headers['ETag']
+        if 'Last-Modified' in res.headers:
+            validators['If-Modified-Since'] = res.headers['Last-Modified']
+        return validators
+
+    def _update_high_water_mark(self, ids: str, observed: datetime):
+        if ids not in self.high_water_marks:
+            self.high_water_marks[ids] = observed
+        else:
+            self.high_water_marks[ids] = max(
+                self.high_water_marks[ids],
+                observed,
+            )
 
 
 class WeatherGovMetarDownloader(MetarCsvDownloader):
 
+    SOURCE: str = "weathergov"
+
     def __init__(
         self,
         stations: Dict[str, Station],
         target_dir: os.PathLike = "data",
+        compression: Optional[str] = None,
+        latest: Optional[LatestObservations] = None,
+        archive: Optional[RawResponseArchive] = None,
+        granularity: str = "daily",
+        region: Optional[str] = None,
     ):
-        super().__init__(stations, target_dir)
+        super().__init__(
+            stations,
+            target_dir,
+            compression,
+            latest,
+            archive,
+            granularity,
+            region,
+        )
 
     def download1(
         self,
@@ -316,6 +717,18 @@ class WeatherGovMetarDownloader(MetarCsvDownloader):
         start_datetime: datetime,
         end_datetime: datetime,
     ) -> bool:
+        return self._download(self.fetch1(
+            stations_to_search=stations_to_search,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+        ))
+
+    def fetch1(
+        self,
+        stations_to_search: List[Station],
+        start_datetime: datetime,
+        end_datetime: datetime,
+    ) -> Optional[FetchedResponse]:
         if not isinstance(start_datetime, datetime):
             raise ValueError(
                 f"start_datetime must "
@@ -350,6 +763,7 @@ class WeatherGovMetarDownloader(MetarCsvDownloader):
         }
 
         try:
+            fetched_at = datetime.utcnow()
             res = requests.get(base_url, params=params)
             res.raise_for_status()
             raw_json = res.json()
@@ -360,14 +774,14 @@ class WeatherGovMetarDownloader(MetarCsvDownloader):
                 f"Status code: {e.response.status_code}."
                 f"Error: {e}"
             )
-            return False
+            return None
         except requests.exceptions.ConnectionError as e:
             logger.error(
                 f"Failed to connect to {base_url} "
                 f"with params {params}. "
                 f"Error: {e}"
             )
-            return False
+            return None
         except requests.exceptions.JSONDecodeError as e:
             logger.error(
                 f"Failed to decode JSON response from {base_url} "
@@ -375,15 +789,52 @@ class WeatherGovMetarDownloader(MetarCsvDownloader):
                 f"Response: {res.text}. "
                 f"Error: {e}"
             )
-            return False
+            return None
         except Exception as e:
             logger.error(
                 f"Failed to fetch data from {base_url} "
                 f"with params {params}. "
                 f"Error: {e}"
             )
-            return False
+            return None
+
+        params = {k: v for k, v in params.items() if k != 'token'}
+        self._archive_response(params, res.text, fetched_at)
+        return FetchedResponse(
+            params=params,
+            body=res.text,
+            fetched_at=fetched_at,
+            payload=raw_json,
+        )
+
+    def parse_response(
+        self,
+        response: FetchedResponse,
+    ) -> List[Dict[str, str]]:
+        start_datetime = datetime.strptime(
+            response.params['start'],
+            "%Y%m%d%H%M",
+        )
+        return self._fetch_data_from_raw_metars(
+            self._raw_metars_from_json(response.payload),
+            year=start_datetime.year,
+            month=start_datetime.month,
+        )
 
+    def replay_response(
+        self,
+        body: str,
+        params: Dict[str, str],
+        fetched_at: datetime,
+    ) -> List[Dict[str, str]]:
+        return self.parse_response(FetchedResponse(
+            params=params,
+            body=body,
+            fetched_at=fetched_at,
+            payload=json.loads(body),
+        ))
+
+    def _raw_metars_from_json(self, raw_json: Dict) -> List[str]:
         raw_metars = []
         for station in raw_json['STATION']:
             if 'OBSERVATIONS' not in station:
@@ -391,24 +842,4 @@ class WeatherGovMetarDownloader(MetarCsvDownloader):
             if 'metar_set_1' not in station['OBSERVATIONS']:
                 continue
             raw_metars.extend(station['OBSERVATIONS']['metar_set_1'])
-
-        for raw_metar in raw_metars:
-            try:
-                data = self._fetch_data_from_raw_metar(
-                    raw_metar,
-                    year=start_datetime.year,
-                    month=start_datetime.month,
-                )
-            except Exception as e:
-                logger.error(
-                    "[FATAL] "
-                    f"Failed to parse raw METAR {raw_metar}. "
-                    f"Error: {e}"
-                )
-                continue
-            if data is not None:
-                self.data.append(data)
-
-        self._dump_data()
-
-        return True
+        return raw_metars
@@ -0,0 +1,243 @@
+import json
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from pymetard.logger import logger
+from pymetard.metar import Station
+
+
+class LatestObservations:
+
+    VALUE_FIELDS: List[str] = [
+        'timestamp',
+        'temperature_c', 'dewpoint_c', 'relativehumidity',
+        'pressure_mb', 'pressuresea_mb',
+        'winddirection_deg', 'windspeed_kt', 'windgust_kt',
+    ]
+
+    def __init__(
+        self,
+        stations: Dict[str, Station],
+        cell_size: float = 1.0,
+    ):
+        self.stations = stations
+        self.codes = sorted(stations.keys())
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.values = np.full(
+            (len(self.codes), len(self.VALUE_FIELDS)),
+            np.nan,
+        )
+        self.raw: List[Optional[str]] = [None] * len(self.codes)
+        self.lock = threading.Lock()
+        # Stations bucketed by lat/lng cells for bbox lookups
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for code, i in self.index.items():
+            station = stations[code]
+            cell = self._cell(station.longitude, station.latitude)
+            self.cells.setdefault(cell, []).append(i)
+
+    def _cell(self, lng: float, lat: float) -> Tuple[int, int]:
+        return (
+            math.floor(lng / self.cell_size),
+            math.floor(lat / self.cell_size),
+        )
+
+    def update(self, row: Dict[str, str]):
+        i = self.index.get(row['code'])
+        if i is None:
+            return
+        values = [
+            np.nan if row[field] is None else float(row[field])
+            for field in self.VALUE_FIELDS
+        ]
+        with self.lock:
+            if values[0] < self.values[i, 0]:
+                # Keep the most recent observation only
+                return
+            self.values[i] = values
+            self.raw[i] = row['rawmetar']
+
+    def _observation(self, i: int) -> Optional[Dict]:
+        if self.raw[i] is None:
+            return None
+        station = self.stations[self.codes[i]]
+        observation = {
+            'name': station.name,
+            'code': station.code4,
+            'lng': station.longitude,
+            'lat': station.latitude,
+            'ele': station.elevation,
+        }
+        for field, value in zip(self.VALUE_FIELDS, self.values[i].tolist()):
+            observation[field] = None if math.isnan(value) else value
+        observation['rawmetar'] = self.raw[i]
+        return observation
+
+    def get(self, code: str) -> Optional[Dict]:
+        i = self.index.get(code)
+        if i is None:
+            return None
+        with self.lock:
+            return self._observation(i)
+
+    def get_many(self, codes: List[str]) -> List[Dict]:
+        with self.lock:
+            observations = [
+                self._observation(self.index[code])
+                for code in codes
+                if code in self.index
+            ]
+        return [o for o in observations if o is not None]
+
+    def in_bbox(
+        self,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+    ) -> List[Dict]:
+        if not all([
+            -180 <= min_lng <= max_lng <= 180,
+            -90 <= min_lat <= max_lat <= 90,
+        ]):
+            # Also refuses nan and inf, which fail every comparison
+            raise ValueError(
+                f"Invalid bbox {min_lng},{min_lat},{max_lng},{max_lat}"
+            )
+        min_x, min_y = self._cell(min_lng, min_lat)
+        max_x, max_y = self._cell(max_lng, max_lat)
+        n_cells = (max_x - min_x + 1) * (max_y - min_y + 1)
+        candidates = []
+        if n_cells > len(self.cells):
+            # Large boxes scan the occupied cells instead, so the cost is
+            # bounded by the number of stations rather than the box area
+            for (x, y), indices in self.cells.items():
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    candidates.extend(indices)
+        else:
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    candidates.extend(self.cells.get((x, y), []))
+        observations = []
+        with self.lock:
+            for i in candidates:
+                station = self.stations[self.codes[i]]
+                if not min_lng <= station.longitude <= max_lng:
+                    continue
+                if not min_lat <= station.latitude <= max_lat:
+                    continue
+                observation = self._observation(i)
+                if observation is not None:
+                    observations.append(observation)
+        return observations
+
+    def save(self, file_path: os.PathLike):
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            values = self.values.copy()
+            raw = ["" if r is None else r for r in self.raw]
+        # Write aside then rename, so a crash never leaves a broken snapshot
+        tmp_path = file_path.with_name(f"{file_path.name}.tmp")
+        with tmp_path.open('wb') as f:
+            np.savez(
+                f,
+                codes=np.array(self.codes),
+                fields=np.array(self.VALUE_FIELDS),
+                values=values,
+                raw=np.array(raw),
+            )
+        os.replace(tmp_path, file_path)
+
+    def load(self, file_path: os.PathLike):
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Snapshot {file_path} not found")
+        with np.load(file_path) as snapshot:
+            codes = snapshot['codes'].tolist()
+            fields = snapshot['fields'].tolist()
+            values = snapshot['values']
+            raw = snapshot['raw'].tolist()
+        columns = [fields.index(field) for field in self.VALUE_FIELDS]
+        with self.lock:
+            # Station list may have changed since the snapshot was taken
+            for j, code in enumerate(codes):
+                i = self.index.get(code)
+                if i is None or not raw[j]:
+                    continue
+                if values[j, columns[0]] < self.values[i, 0]:
+                    continue
+                self.values[i] = values[j, columns]
+                self.raw[i] = raw[j]
+
+
+class LatestObservationsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        latest = self.server.latest
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        if not parts or parts[0] != "latest" or len(parts) > 2:
+            self._send_json(404, {'error': f"Unknown path {url.path}"})
+            return
+        try:
+            if len(parts) == 2:
+                observation = latest.get(parts[1].upper())
+                if observation is None:
+                    self._send_json(
+                        404,
+                        {'error': f"No observation for {parts[1]}"},
+                    )
+                    return
+                self._send_json(200, observation)
+            elif 'bbox' in query:
+                bbox = [float(v) for v in query['bbox'][0].split(",")]
+                if len(bbox) != 4:
+                    raise ValueError(
+                        "bbox must be min_lng,min_lat,max_lng,max_lat"
+                    )
+                self._send_json(200, latest.in_bbox(*bbox))
+            elif 'codes' in query:
+                codes = query['codes'][0].upper().split(",")
+                self._send_json(200, latest.get_many(codes))
+            else:
+                raise ValueError("Expected a station code, codes or bbox")
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"[latest] {self.address_string()} {format % args}")
+
+
+def serve_latest_observations(
+    latest: LatestObservations,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), LatestObservationsRequestHandler)
+    server.daemon_threads = True
+    server.latest = latest
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(
+        f"Serving latest observations on "
+        f"http://{server.server_address[0]}:{server.server_address[1]}/latest"
+    )
+    return server
@@ -0,0 +1,194 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymetard.logger import logger
+from pymetard.metar.storage import (
+    append_data_file,
+    data_file_suffix,
+    dump_data_file,
+    iter_data_file,
+)
+
+
+# Earlier sources win when the same report was stored from several
+SOURCE_PRIORITY: List[str] = ["awc", "weathergov"]
+
+VALUE_FIELDS: List[str] = [
+    'temperature_c', 'dewpoint_c', 'relativehumidity',
+    'pressure_mb', 'pressuresea_mb',
+    'winddirection_deg', 'windspeed_kt', 'windgust_kt',
+]
+
+REPORT_TYPES = ("METAR", "SPECI")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_raw_metar(metar_raw: str) -> str:
+    metar_raw = _WHITESPACE_RE.sub(" ", metar_raw.replace("\x00", ""))
+    metar_raw = metar_raw.strip().rstrip("=").rstrip()
+    head, _, tail = metar_raw.partition(" ")
+    if head in REPORT_TYPES and tail:
+        metar_raw = tail
+    return metar_raw
+
+
+def merge_key(row: Dict[str, str]) -> str:
+    # Station and observation time are part of the report itself
+    return normalize_raw_metar(row['rawmetar'])
+
+
+def _rank(
+    row: Dict[str, str],
+    priority: Sequence[str],
+) -> Tuple[int, int]:
+    source = row.get('source') or ""
+    source_rank = (
+        len(priority) - priority.index(source) if source in priority else 0
+    )
+    completeness = sum(
+        1 for field in VALUE_FIELDS if row.get(field) not in (None, "")
+    )
+    return source_rank, completeness
+
+
+def _csv_values(row: Dict[str, str], fields: List[str]) -> List[str]:
+    # As written by the csv module, to compare new rows with loaded ones
+    return ["" if row.get(f) is None else str(row.get(f)) for f in fields]
+
+
+def merge_rows(
+    rows: Iterable[Dict[str, str]],
+    priority: Optional[Sequence[str]] = None,
+) -> List[Dict[str, str]]:
+    priority = SOURCE_PRIORITY if priority is None else priority
+    winners: Dict[str, Dict[str, str]] = {}
+    for row in rows:
+        key = merge_key(row)
+        winner = winners.get(key)
+        if winner is None or _rank(row, priority) > _rank(winner, priority):
+            # Replacing keeps the position of the first report seen
+            winners[key] = row
+    return list(winners.values())
+
+
+def merge_data_file(
+    rows: Iterable[Dict[str, str]],
+    file_path: os.PathLike,
+    fields: List[str],
+    compression: Optional[str] = None,
+    priority: Optional[Sequence[str]] = None,
+    replace: bool = False,
+) -> int:
+    priority = SOURCE_PRIORITY if priority is None else priority
+    file_path = Path(file_path)
+    existing: Dict[str, Dict[str, str]] = {}
+    rewrite = False
+    if file_path.exists() and file_path.stat().st_size > 0:
+        n_existing = 0
+        truncated = []
+        for row in iter_data_file(
+            file_path,
+            on_truncated=lambda: truncated.append(file_path),
+        ):
+            n_existing += 1
+            if n_existing == 1 and list(row.keys()) != fields:
+                # Appending would misalign columns under the old header
+                rewrite = True
+            key = merge_key(row)
+            winner = existing.get(key)
+            if winner is not None:
+                rewrite = True
+                if _rank(row, priority) <= _rank(winner, priority):
+                    continue
+            existing[key] = row
+        if n_existing == 0 or truncated:
+            # Appending after a torn gzip member would not be readable
+            rewrite = True
+
+    added: Dict[str, Dict[str, str]] = {}
+    for row in rows:
+        key = merge_key(row)
+        winner = existing.get(key, added.get(key))
+        if winner is not None:
+            rank, winner_rank = _rank(row, priority), _rank(winner, priority)
+            # In replace mode, e.g. when replaying, new rows win ties
+            if rank < winner_rank or (rank == winner_rank and not replace):
+                continue
+            if _csv_values(row, fields) == _csv_values(winner, fields):
+                continue
+        if key in existing:
+            rewrite = True
+            existing[key] = row
+        else:
+            added[key] = row
+
+    if rewrite:
+        # At most one rewrite per file, aside then renamed
+        tmp_path = file_path.with_name(f"{file_path.name}.tmp")
+        dump_data_file(
+            list(existing.values()) + list(added.values()),
+            tmp_path,
+            fields=fields,
+            compression=compression,
+        )
+        os.replace(tmp_path, file_path)
+    elif added:
+        append_data_file(
+            added.values(),
+            file_path,
+            fields=fields,
+            compression=compression,
+        )
+    logger.debug(
+        f"Merged {len(added)} new rows into {file_path}"
+        + (" (rewritten)" if rewrite else "")
+    )
+    return len(added)
+
+
+def merge_data_dirs(
+    source_dirs: List[os.PathLike],
+    target_dir: os.PathLike,
+    fields: List[str],
+    compression: Optional[str] = None,
+    priority: Optional[Sequence[str]] = None,
+) -> int:
+    # Data files at the same place in every source directory are
+    # merged into the target data file in a single pass
+    suffix = data_file_suffix(compression)
+    target_dir = Path(target_dir)
+    data_files: Dict[Path, List[Path]] = {}
+    for source_dir in source_dirs:
+        source_dir = Path(source_dir)
+        for file_path in sorted(source_dir.glob("[0-9]*/**/*.csv*")):
+            if not file_path.name.endswith((".csv", ".csv.gz")):
+                continue
+            partition = file_path.name.split(".")[0]
+            target_path = (
+                target_dir
+                / file_path.parent.relative_to(source_dir)
+                / f"{partition}{suffix}"
+            )
+            data_files.setdefault(target_path, []).append(file_path)
+    n_rows = 0
+    for target_path in sorted(data_files.keys()):
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        n_rows += merge_data_file(
+            (
+                row
+                for file_path in data_files[target_path]
+                if file_path.resolve() != target_path.resolve()
+                for row in iter_data_file(file_path)
+            ),
+            target_path,
+            fields=fields,
+            compression=compression,
+            priority=priority,
+        )
+        logger.info(
+            f"Merged {len(data_files[target_path])} files into {target_path}"
+        )
+    return n_rows
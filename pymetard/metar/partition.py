@@ -0,0 +1,210 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymetard.logger import logger
+from pymetard.metar import Station
+from pymetard.metar.merge import merge_data_file
+from pymetard.metar.storage import (
+    data_file_suffix,
+    iter_data_file,
+)
+
+
+# Partition key format per granularity, always in UTC
+GRANULARITIES: Dict[str, str] = {
+    'hourly': "%Y%m%d%H",
+    'daily': "%Y%m%d",
+    'monthly': "%Y%m",
+}
+
+_KEY_GRANULARITIES: Dict[int, str] = {
+    len(datetime(2000, 1, 1).strftime(fmt)): granularity
+    for granularity, fmt in GRANULARITIES.items()
+}
+
+# Station regions to sub-partition by, the ICAO region is the first
+# letter of the station code
+REGIONS = (None, "icao", "country")
+
+UNKNOWN_REGION = "XX"
+
+
+def check_granularity(granularity: str) -> str:
+    if granularity not in GRANULARITIES:
+        raise ValueError(
+            f"Unsupported granularity {granularity}, "
+            f"expected one of {tuple(GRANULARITIES.keys())}"
+        )
+    return granularity
+
+
+def check_region(region: Optional[str]) -> Optional[str]:
+    if region not in REGIONS:
+        raise ValueError(
+            f"Unsupported region {region}, expected one of {REGIONS}"
+        )
+    return region
+
+
+def utc_timestamp(observed_at: datetime) -> float:
+    # Naive datetimes are taken as UTC, whatever the host timezone is
+    if observed_at.tzinfo is None:
+        observed_at = observed_at.replace(tzinfo=timezone.utc)
+    return observed_at.timestamp()
+
+
+def utc_datetime(timestamp: float) -> datetime:
+    # Naive UTC, like the datetimes decoded from METAR
+    return datetime.fromtimestamp(
+        float(timestamp),
+        tz=timezone.utc,
+    ).replace(tzinfo=None)
+
+
+def station_region(station: Station, region: str) -> str:
+    if region == "icao":
+        code = station.code4[:1]
+    else:
+        # Country is the last column of the station file
+        code = station.raw.strip()[-2:]
+    code = code.strip().upper()
+    return code if code.isalnum() else UNKNOWN_REGION
+
+
+def partition_key(
+    observed_at: datetime,
+    granularity: str = "daily",
+    region: Optional[str] = None,
+) -> str:
+    key = observed_at.strftime(GRANULARITIES[granularity])
+    if region is not None:
+        key = f"{key}-{region}"
+    return key
+
+
+def partition_start(observed_at: datetime, granularity: str) -> datetime:
+    return datetime.strptime(
+        observed_at.strftime(GRANULARITIES[granularity]),
+        GRANULARITIES[granularity],
+    )
+
+
+def parse_partition_key(key: str) -> Tuple[str, Optional[str]]:
+    time_key, _, region = key.partition("-")
+    granularity = _KEY_GRANULARITIES.get(len(time_key))
+    if granularity is None:
+        raise ValueError(f"Invalid partition {key}")
+    # Will raise if invalid
+    datetime.strptime(time_key, GRANULARITIES[granularity])
+    return granularity, region or None
+
+
+def partition_file_path(
+    target_dir: os.PathLike,
+    key: str,
+    compression: Optional[str] = None,
+) -> Path:
+    # Daily partitions keep the YYYY/MM/YYYYMMDD layout, hourly ones go
+    # one level deeper and monthly ones one level up
+    granularity, _ = parse_partition_key(key)
+    parts = {
+        'hourly': [key[:4], key[4:6], key[6:8]],
+        'daily': [key[:4], key[4:6]],
+        'monthly': [key[:4]],
+    }[granularity]
+    suffix = data_file_suffix(compression)
+    return Path(target_dir).joinpath(*parts) / f"{key}{suffix}"
+
+
+def partition_files(
+    target_dir: os.PathLike,
+    granularity: Optional[str] = None,
+) -> Dict[str, List[Path]]:
+    files: Dict[str, List[Path]] = {}
+    for file_path in sorted(Path(target_dir).glob("[0-9]*/**/*.csv*")):
+        if not file_path.name.endswith((".csv", ".csv.gz")):
+            continue
+        key = file_path.name.split(".")[0]
+        try:
+            key_granularity, _ = parse_partition_key(key)
+        except ValueError:
+            continue
+        if granularity is None or key_granularity == granularity:
+            files.setdefault(key, []).append(file_path)
+    return files
+
+
+def consolidate_partitions(
+    target_dir: os.PathLike,
+    fields: List[str],
+    from_granularity: str = "hourly",
+    to_granularity: str = "daily",
+    before: Optional[datetime] = None,
+    compression: Optional[str] = None,
+    priority: Optional[Sequence[str]] = None,
+) -> int:
+    check_granularity(from_granularity)
+    check_granularity(to_granularity)
+    order = list(GRANULARITIES.keys())
+    if order.index(to_granularity) <= order.index(from_granularity):
+        raise ValueError(
+            f"Cannot consolidate {from_granularity} "
+            f"into {to_granularity} partitions"
+        )
+    if before is None:
+        before = datetime.utcnow()
+    # Only periods closed before the cutoff, hot partitions stay as is
+    before = partition_start(before, to_granularity)
+    cold: Dict[str, List[Path]] = {}
+    for key, file_paths in partition_files(
+        target_dir,
+        from_granularity,
+    ).items():
+        time_key, _, region = key.partition("-")
+        start = datetime.strptime(time_key, GRANULARITIES[from_granularity])
+        if partition_start(start, to_granularity) >= before:
+            continue
+        cold_key = partition_key(start, to_granularity, region or None)
+        cold.setdefault(cold_key, []).extend(file_paths)
+    n_files = 0
+    for cold_key in sorted(cold.keys()):
+        cold_path = partition_file_path(target_dir, cold_key, compression)
+        cold_path.parent.mkdir(parents=True, exist_ok=True)
+        hot_paths = cold[cold_key]
+        # Taken before reading, a writer appending late reports to a hot
+        # partition in the meantime changes its size or mtime
+        hot_stats = {
+            file_path: _file_version(file_path) for file_path in hot_paths
+        }
+        merge_data_file(
+            (
+                row
+                for file_path in hot_paths
+                for row in iter_data_file(file_path)
+            ),
+            cold_path,
+            fields=fields,
+            compression=compression,
+            priority=priority,
+        )
+        # Removed only once the cold partition is written, and only if
+        # unchanged since read. Changed ones are merged again next time
+        n_removed = 0
+        for file_path in hot_paths:
+            if _file_version(file_path) != hot_stats[file_path]:
+                logger.warning(
+                    f"{file_path} changed while consolidating, keeping it"
+                )
+                continue
+            file_path.unlink()
+            n_removed += 1
+        n_files += n_removed
+        logger.info(f"Consolidated {n_removed} files into {cold_path}")
+    return n_files
+
+
+def _file_version(file_path: Path) -> Tuple[int, int]:
+    stat = file_path.stat()
+    return stat.st_size, stat.st_mtime_ns
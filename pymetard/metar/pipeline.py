@@ -0,0 +1,208 @@
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from pymetard.logger import logger
+from pymetard.metar.downloader import (
+    FetchedResponse,
+    MetarCsvDownloader,
+)
+
+
+# Tells a stage to exit once everything queued before it is processed
+_STOP = object()
+
+
+class MetarPipeline:
+
+    def __init__(
+        self,
+        downloader: MetarCsvDownloader,
+        fetchers: int = 2,
+        parsers: int = 1,
+        queue_size: int = 4,
+        flush_rows: int = 20000,
+        flush_interval: float = 60.0,
+        retry_interval: float = 10.0,
+        max_write_failures: int = 3,
+    ):
+        self.downloader = downloader
+        self.n_fetchers = fetchers
+        self.n_parsers = parsers
+        # Bounded queues, a slow stage blocks the ones before it
+        self.jobs: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.responses: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.rows: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.max_write_failures = max_write_failures
+        self.write_failures = 0
+        self.write_error: Optional[Exception] = None
+        # Responses whose rows are buffered but not written yet
+        self.unwritten: List[FetchedResponse] = []
+        self.stopping = threading.Event()
+        self.closed = False
+        self.threads: Dict[str, List[threading.Thread]] = {}
+
+    def __enter__(self) -> "MetarPipeline":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        self.threads = {
+            'fetch': [
+                threading.Thread(target=self._fetch_loop, daemon=True)
+                for _ in range(self.n_fetchers)
+            ],
+            'parse': [
+                threading.Thread(target=self._parse_loop, daemon=True)
+                for _ in range(self.n_parsers)
+            ],
+            'write': [threading.Thread(target=self._write_loop, daemon=True)],
+        }
+        for threads in self.threads.values():
+            for thread in threads:
+                thread.start()
+
+    def submit(self, **kwargs):
+        if self.closed:
+            raise RuntimeError("Pipeline is closed")
+        # Blocks while the fetchers are behind
+        self.jobs.put(kwargs)
+
+    def join(self):
+        self.jobs.join()
+        self.responses.join()
+        self.flush()
+        self._raise_write_error()
+
+    def flush(self):
+        flushed = threading.Event()
+        self.rows.put(flushed)
+        flushed.wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # Queued jobs are still fetched, but failed fetches are no longer
+        # retried. Everything fetched is parsed and written before returning
+        self.stopping.set()
+        for stage, stage_queue in [
+            ('fetch', self.jobs),
+            ('parse', self.responses),
+            ('write', self.rows),
+        ]:
+            for _ in self.threads[stage]:
+                stage_queue.put(_STOP)
+            for thread in self.threads[stage]:
+                thread.join()
+        if self.downloader.data:
+            raise RuntimeError(
+                f"Pipeline closed with {len(self.downloader.data)} rows "
+                "not written"
+            ) from self.write_error
+        logger.info("Pipeline drained")
+
+    def _fetch_loop(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is _STOP:
+                    return
+                response = self.downloader.fetch1(**job)
+                while response is None:
+                    if self.stopping.wait(self.retry_interval):
+                        break
+                    response = self.downloader.fetch1(**job)
+                if response is not None:
+                    self.responses.put(response)
+            except Exception as e:
+                logger.error(f"Failed to fetch with {job}. Error: {e}")
+            finally:
+                self.jobs.task_done()
+
+    def _parse_loop(self):
+        while True:
+            response = self.responses.get()
+            try:
+                if response is _STOP:
+                    return
+                self.rows.put(
+                    (response, self.downloader.parse_response(response))
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to parse response of {response.params}. "
+                    f"Error: {e}"
+                )
+            finally:
+                self.responses.task_done()
+
+    def _write_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.rows.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            try:
+                if item is _STOP or isinstance(item, threading.Event):
+                    self._write()
+                    last_flush = time.monotonic()
+                    if item is _STOP:
+                        return
+                    continue
+                if item is not None:
+                    response, rows = item
+                    for data in rows:
+                        self.downloader._collect_data(data)
+                    self.unwritten.append(response)
+                if any([
+                    len(self.downloader.data) >= self.flush_rows,
+                    time.monotonic() - last_flush >= self.flush_interval,
+                ]):
+                    self._write()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                # Keep the writer alive, flush() waits on it
+                logger.error(f"Failed to collect rows. Error: {e}")
+            finally:
+                if isinstance(item, threading.Event):
+                    item.set()
+                if item is not None:
+                    self.rows.task_done()
+
+    def _write(self):
+        if self.downloader.data:
+            try:
+                self.downloader._dump_data()
+            except Exception as e:
+                # Rows stay buffered and are written with the next batch,
+                # until too many writes in a row failed
+                self.write_failures += 1
+                logger.error(
+                    f"Failed to write data "
+                    f"({self.write_failures}/{self.max_write_failures}). "
+                    f"Error: {e}"
+                )
+                if self.write_failures >= self.max_write_failures:
+                    self.write_error = e
+                return
+            self.write_failures = 0
+            self.write_error = None
+        for response in self.unwritten:
+            self.downloader.commit_response(response)
+        self.unwritten = []
+
+    def _raise_write_error(self):
+        if self.write_error is not None:
+            raise RuntimeError(
+                f"Writing data failed {self.write_failures} times in a row, "
+                f"{len(self.downloader.data)} rows not written"
+            ) from self.write_error
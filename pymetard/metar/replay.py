@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymetard.logger import logger
+from pymetard.metar import Station
+from pymetard.metar.archive import RawResponseArchive
+from pymetard.metar.downloader import (
+    AviationWeatherCenterMetarDownloader,
+    MetarCsvDownloader,
+    WeatherGovMetarDownloader,
+)
+
+
+DOWNLOADERS = {
+    AviationWeatherCenterMetarDownloader.SOURCE:
+        AviationWeatherCenterMetarDownloader,
+    WeatherGovMetarDownloader.SOURCE: WeatherGovMetarDownloader,
+}
+
+# Per worker process state, set up once by _init_worker
+_archive: Optional[RawResponseArchive] = None
+_parsers: Dict[str, MetarCsvDownloader] = {}
+
+
+def _init_worker(
+    archive_dir: os.PathLike,
+    stations: Dict[str, Station],
+    target_dir: os.PathLike,
+):
+    global _archive, _parsers
+    _archive = RawResponseArchive(archive_dir)
+    _parsers = {
+        source: downloader_class(stations=stations, target_dir=target_dir)
+        for source, downloader_class in DOWNLOADERS.items()
+    }
+
+
+def _replay_entry(file_path: os.PathLike) -> List[Dict[str, str]]:
+    entry = _archive.load(file_path)
+    if entry['source'] not in _parsers:
+        logger.error(
+            f"Unknown source {entry['source']} in archive entry {file_path}"
+        )
+        return []
+    return _parsers[entry['source']].replay_response(
+        entry['body'],
+        entry['params'],
+        entry['fetched_at'],
+    )
+
+
+def replay_archive(
+    archive: RawResponseArchive,
+    stations: Dict[str, Station],
+    target_dir: os.PathLike = "data",
+    compression: Optional[str] = None,
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    processes: Optional[int] = None,
+    batch_size: int = 100,
+    granularity: str = "daily",
+    region: Optional[str] = None,
+    replace: bool = False,
+) -> int:
+    entries = archive.entries(source=source, start=start, end=end)
+    logger.info(f"Replaying {len(entries)} archived responses")
+    # Parsing runs in the workers, rows are written by this process only
+    writer = MetarCsvDownloader(
+        stations=stations,
+        target_dir=target_dir,
+        compression=compression,
+        granularity=granularity,
+        region=region,
+        replace=replace,
+    )
+    initargs = (archive.archive_dir, stations, target_dir)
+    if processes == 1:
+        _init_worker(*initargs)
+        results = map(_replay_entry, entries)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(
+            processes=processes,
+            initializer=_init_worker,
+            initargs=initargs,
+        )
+        results = pool.imap(_replay_entry, entries, chunksize=4)
+    n_rows = 0
+    try:
+        for i, rows in enumerate(results):
+            writer.data.extend(rows)
+            n_rows += len(rows)
+            if (i + 1) % batch_size == 0:
+                writer._dump_data()
+                logger.info(f"Replayed {i + 1}/{len(entries)}")
+        writer._dump_data()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return n_rows
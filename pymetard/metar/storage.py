@@ -0,0 +1,147 @@
+import csv
+import gzip
+import os
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional
+
+from pymetard.logger import logger
+
+
+COMPRESSIONS = (None, "gzip")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Window bits for zlib to expect a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+GZIP_CHUNK_SIZE = 1 << 16
+
+
+def check_compression(compression: Optional[str]) -> Optional[str]:
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Unsupported compression {compression}, "
+            f"expected one of {COMPRESSIONS}"
+        )
+    return compression
+
+
+def data_file_suffix(compression: Optional[str] = None) -> str:
+    check_compression(compression)
+    if compression == "gzip":
+        return ".csv.gz"
+    return ".csv"
+
+
+def is_gzip_file(file_path: os.PathLike) -> bool:
+    with Path(file_path).open('rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def open_data_file(
+    file_path: os.PathLike,
+    mode: str = 'r',
+    compression: Optional[str] = None,
+) -> IO[str]:
+    file_path = Path(file_path)
+    if compression == "gzip":
+        return gzip.open(file_path, f"{mode}t")
+    return file_path.open(mode)
+
+
+def _iter_gzip_lines(
+    file_path: os.PathLike,
+    on_truncated: Optional[Callable[[], None]] = None,
+) -> Iterator[str]:
+    # Members are decompressed one by one and only used once complete,
+    # so a member cut short by a crash during an append is dropped
+    # instead of making the whole file unreadable
+    pending = ""
+    member: List[bytes] = []
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    started = corrupt = False
+    with Path(file_path).open('rb') as f:
+        while not corrupt:
+            chunk = f.read(GZIP_CHUNK_SIZE)
+            if not chunk:
+                break
+            while chunk:
+                started = True
+                try:
+                    member.append(decompressor.decompress(chunk))
+                except zlib.error:
+                    corrupt = True
+                    break
+                if not decompressor.eof:
+                    break
+                lines = (pending + b"".join(member).decode()).split("\n")
+                pending = lines.pop()
+                for line in lines:
+                    yield f"{line}\n"
+                # The rest of the chunk belongs to the next member
+                chunk = decompressor.unused_data
+                member = []
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                started = False
+    if started:
+        logger.warning(
+            f"Data file {file_path} ends with a truncated gzip member, "
+            "ignoring it"
+        )
+        if on_truncated is not None:
+            on_truncated()
+    if pending:
+        yield pending
+
+
+def iter_data_file(
+    file_path: os.PathLike,
+    on_truncated: Optional[Callable[[], None]] = None,
+) -> Iterator[Dict[str, str]]:
+    file_path = Path(file_path)
+    if not file_path.exists():
+        raise FileNotFoundError(f"File {file_path} not found")
+    # Detect compression from content rather than suffix so that
+    # plain and compressed archives can be read side by side
+    if is_gzip_file(file_path):
+        lines = _iter_gzip_lines(file_path, on_truncated)
+        yield from csv.DictReader(lines, delimiter=',')
+        return
+    with open_data_file(file_path, 'r') as f:
+        yield from csv.DictReader(f, delimiter=',')
+
+
+def load_data_file(file_path: os.PathLike) -> List[Dict[str, str]]:
+    return list(iter_data_file(file_path))
+
+
+def dump_data_file(
+    data: Iterable[Dict[str, str]],
+    file_path: os.PathLike,
+    fields: List[str],
+    compression: Optional[str] = None,
+):
+    with open_data_file(file_path, 'w', compression) as f:
+        writer = csv.DictWriter(f, fieldnames=fields, delimiter=',')
+        writer.writeheader()
+        for row in data:
+            writer.writerow(row)
+
+
+def append_data_file(
+    data: Iterable[Dict[str, str]],
+    file_path: os.PathLike,
+    fields: List[str],
+    compression: Optional[str] = None,
+):
+    file_path = Path(file_path)
+    is_empty = not file_path.exists() or file_path.stat().st_size == 0
+    # Each append to a gzip file adds a new member (frame), multi-member
+    # files are decompressed transparently as one stream when read back
+    with open_data_file(file_path, 'a', compression) as f:
+        writer = csv.DictWriter(f, fieldnames=fields, delimiter=',')
+        if is_empty:
+            writer.writeheader()
+        for row in data:
+            writer.writerow(row)
@@ -0,0 +1,199 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pymetard.logger import logger
+
+
+class Profiler:
+
+    def __init__(
+        self,
+        output_dir: os.PathLike = "profiles",
+        command: str = "pymetard",
+        params: Optional[Dict] = None,
+        cycles: Optional[int] = None,
+        seconds: Optional[float] = None,
+        sample_interval: float = 0.01,
+        top: int = 50,
+    ):
+        self.output_dir = Path(output_dir)
+        self.command = command
+        self.params = params or {}
+        self.cycles = cycles
+        self.seconds = seconds
+        self.sample_interval = sample_interval
+        self.top = top
+        self.profile = cProfile.Profile()
+        # One profile per thread before Python 3.12, where cProfile only
+        # sees the thread it was enabled in
+        self.thread_profiles: Dict[int, cProfile.Profile] = {}
+        self.stacks: Counter = Counter()
+        self.n_cycles = 0
+        self.started_at: Optional[float] = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.sampler: Optional[threading.Thread] = None
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.time()
+        tracemalloc.start(10)
+        self.baseline = tracemalloc.take_snapshot()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+        if sys.version_info >= (3, 12):
+            # Built on sys.monitoring, covers every thread
+            self.profile.enable()
+        else:
+            # This thread and threads started from now on, e.g. pipeline
+            # stages, get a profile of their own. A trace hook enables it
+            # on the first call, and disables it on the first call after
+            # stop() as it can only be disabled from its own thread
+            threading.settrace(self._trace)
+            sys.settrace(self._trace)
+        logger.info(
+            f"Profiling {self.command} "
+            f"for {self.cycles or 'all'} cycles"
+            + (f" or {self.seconds} seconds" if self.seconds else "")
+        )
+
+    def tick(self):
+        # Called by commands after each cycle or chunk
+        if not self.running:
+            return
+        self.n_cycles += 1
+        if self.cycles is not None and self.n_cycles >= self.cycles:
+            self.stop()
+        elif self._expired():
+            self.stop()
+
+    def stop(self) -> Optional[Path]:
+        with self.lock:
+            if not self.running:
+                return None
+            self.running = False
+        self.stopping.set()
+        if sys.version_info >= (3, 12):
+            self.profile.disable()
+        else:
+            threading.settrace(None)
+            # Also stops profiling the calling thread right away
+            self._trace(None, "call", None)
+        if threading.current_thread() is not self.sampler:
+            self.sampler.join()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        tracemalloc.stop()
+
+        stopped_at = time.time()
+        save_dir = self.output_dir / (
+            f"{self.command}-"
+            f"{datetime.utcfromtimestamp(self.started_at):%Y%m%dT%H%M%SZ}"
+        )
+        save_dir.mkdir(parents=True, exist_ok=True)
+        with (save_dir / "meta.json").open('w') as f:
+            json.dump({
+                'command': self.command,
+                'params': self.params,
+                'started_at': self.started_at,
+                'stopped_at': stopped_at,
+                'cycles': self.n_cycles,
+                'samples': sum(self.stacks.values()),
+            }, f, indent=2, default=str)
+        profiles = [self.profile]
+        if sys.version_info < (3, 12):
+            profiles = list(self.thread_profiles.values())
+        pstats.Stats(
+            *[_ProfileSnapshot(profile) for profile in profiles]
+        ).dump_stats(save_dir / "profile.pstats")
+        # Collapsed stacks, as read by flamegraph.pl or speedscope
+        with (save_dir / "stacks.txt").open('w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with (save_dir / "allocations.txt").open('w') as f:
+            f.writelines(self._allocation_report(snapshot))
+        logger.info(f"Profile of {self.command} saved to {save_dir}")
+        return save_dir
+
+    def _expired(self) -> bool:
+        if self.seconds is None:
+            return False
+        return time.time() - self.started_at >= self.seconds
+
+    def _trace(self, frame, event, arg):
+        # Global trace function, only called on new frames, never traces
+        # lines as it returns no local trace function
+        profile = self.thread_profiles.get(threading.get_ident())
+        if self.stopping.is_set():
+            if profile is not None:
+                profile.disable()
+            sys.settrace(None)
+        elif profile is None:
+            profile = cProfile.Profile()
+            self.thread_profiles[threading.get_ident()] = profile
+            profile.enable()
+        return None
+
+    def _sample(self):
+        sampler_id = threading.get_ident()
+        while not self.stopping.wait(self.sample_interval):
+            if self._expired():
+                # The time limit holds even for commands that never
+                # tick, or tick late
+                self.stop()
+                return
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} "
+                        f"({Path(code.co_filename).name}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def _allocation_report(self, snapshot: tracemalloc.Snapshot) -> List[str]:
+        lines = [f"# Top {self.top} allocations by line\n"]
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            lines.append(f"{stat}\n")
+        lines.append(f"\n# Top {self.top} allocation growth since start\n")
+        for stat in snapshot.compare_to(self.baseline, 'lineno')[:self.top]:
+            lines.append(f"{stat}\n")
+        lines.append("\n# Top 10 allocation tracebacks\n")
+        for stat in snapshot.statistics('traceback')[:10]:
+            lines.append(f"\n{stat}\n")
+            lines.extend(f"    {line}\n" for line in stat.traceback.format())
+        return lines
+
+
+class _ProfileSnapshot:
+
+    # Stats of a profile possibly still enabled in another thread, read
+    # without disabling it from the wrong thread as pstats would
+    def __init__(self, profile: cProfile.Profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self):
+        pass
@@ -0,0 +1,134 @@
+import itertools
+import random
+import warnings
+from pathlib import Path
+
+from unittest import TestCase
+
+from metar import Metar
+
+from pymetard.metar.decoder import decode_metar, MetarFields
+
+
+def _value(quantity, *args, **kwargs):
+    if quantity is None:
+        return None
+    return quantity.value(*args, **kwargs)
+
+
+def _reference(metar_raw: str, year: int, month: int) -> MetarFields:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        metar = Metar.Metar(metar_raw, year=year, month=month, strict=False)
+    return MetarFields(
+        station_id=metar.station_id,
+        time=metar.time,
+        temp=_value(metar.temp, units="C"),
+        dewpt=_value(metar.dewpt, units="C"),
+        press=_value(metar.press, units="MB"),
+        press_sea_level=_value(metar.press_sea_level, units="MB"),
+        wind_dir=_value(metar.wind_dir),
+        wind_speed=_value(metar.wind_speed, units="KT"),
+        wind_gust=_value(metar.wind_gust, units="KT"),
+    )
+
+
+def _generated_corpus(size: int = 20000):
+    # Group variants, including some the fast path must refuse
+    headers = ["", "METAR ", "SPECI ", "METAR COR ", "COR "]
+    stations = ["KJFK ", "EGLL ", "K1A2 ", "UUEE "]
+    times = ["011251Z ", "151200Z ", "311255Z ", "010000 ", "291200Z "]
+    modifiers = ["", "AUTO ", "COR ", "CCA ", "NIL ", "COR AUTO "]
+    winds = [
+        "27010KT ", "00000KT ", "VRB03KT ", "36015G25KT ", "270100G120KT ",
+        "27010KT 240V300 ", "27010KT 350V370 ", "37010KT ", "27005MPS ",
+        "27010KTS ", "/////KT ", "27010 ", "", "P99KT ",
+    ]
+    bodies = [
+        "10SM ", "9999 ", "CAVOK ", "1 1/2SM ", "1/2SM ", "M1/4SM ", "P6SM ",
+        "4000NE ", "R24L/P1500 ", "R09/0800V1200FT ", "RVRNO ", "-RA ",
+        "+TSRA ", "VCSH ", "BR ", "FZFG ", "-SHSNBLSN ", "NSW ", "FEW020 ",
+        "SCT025CB ", "BKN008 ", "OVC100 ", "VV002 ", "CLR ", "NSC ",
+        "/////// ", "27015KT ",
+    ]
+    temps = [
+        "05/M03 ", "M05/M10 ", "00/M00 ", "M00/M00 ", "-5/-7 ", "05/ ",
+        "05/// ", "///M02 ", "// ", "", "1/2 ",
+    ]
+    pressures = [
+        "A3012 ", "Q1013 ", "A2992 Q1013 ", "Q1013 A2992 ", "QNH1013 ",
+        "2992 ", "A//// ", "", "SLP123 ", "A3012 SLP045 ",
+    ]
+    tails = [
+        "", "NOSIG ", "TEMPO 3000 BR ", "BECMG 25020G30KT ", "RERA ",
+        "WS R24 ", "R24L/290050 ", "NOSPECI ", "RMK AO2 SLP199 T00501028 ",
+        "RMK AO2 SLP045 ", "RMK AO2 T10051033 ", "RMK T0123 ",
+        "RMK SLPNO T00501028 $ ", "RMK PK WND 28045/15 SLP999 T01110222 ",
+        "RMK LTG DSNT SE T00111022 SLP010 ", "RMK TS OHD MOV E T00111022 ",
+        "NOSIG RMK SLP123 T01230012 ", "TEMPO 4000 -RA RMK T00230012 ",
+        "RMKS SLP001 ", "RMK T00781006 T00801010 SLP163 SLP170 ",
+        "RMK 27010KT T00501028 ", "T00501028 ", "SLP199 RMK ",
+    ]
+    endings = ["", "=", " =", "\n"]
+    rng = random.Random(20230301)
+    groups = [
+        headers, stations, times, modifiers, winds, bodies, bodies,
+        temps, pressures, tails, endings,
+    ]
+    for _ in range(size):
+        parts = [rng.choice(g) for g in groups]
+        yield "".join(parts).strip() + parts[-1]
+
+
+def _handwritten_corpus():
+    # Written by hand in the style of real reports, not a recorded sample
+    path = Path(__file__).parent / "fixtures" / "handwritten_metars.txt"
+    with path.open('r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class TestDecoder(TestCase):
+    def assertSameFields(self, metar_raw, year=2023, month=3):
+        fields = decode_metar(metar_raw, year=year, month=month)
+        if fields is None:
+            return False
+        expected = _reference(metar_raw, year, month)
+        # Compare representations to tell -0.0 from 0.0 as written in CSV
+        self.assertEqual(repr(fields), repr(expected), metar_raw)
+        return True
+
+    def test_decode_metar(self):
+        fields = decode_metar(
+            "METAR KJFK 011351Z 27012G20KT 10SM FEW250 06/M03 A3010 "
+            "RMK AO2 SLP195 T00561028",
+            year=2023,
+            month=3,
+        )
+        self.assertIsNotNone(fields)
+        self.assertEqual(fields.station_id, "KJFK")
+        self.assertEqual(fields.time.isoformat(), "2023-03-01T13:51:00")
+        self.assertEqual(fields.temp, 5.6)
+        self.assertEqual(fields.dewpt, -2.8)
+        self.assertEqual(round(fields.press, 2), 1019.31)
+        self.assertEqual(fields.press_sea_level, 1019.5)
+        self.assertEqual(fields.wind_dir, 270)
+        self.assertEqual(fields.wind_speed, 12)
+        self.assertEqual(fields.wind_gust, 20)
+
+    def test_decode_metar_fallback(self):
+        self.assertIsNone(decode_metar("KXYZ 011255Z NIL"))
+        self.assertIsNone(decode_metar("UUEE 011300Z 20004MPS 9999 Q1011"))
+        self.assertIsNone(decode_metar("KXYZ 311255Z 27010KT", 2023, 2))
+        self.assertIsNone(decode_metar("EGPH 011250Z 27020KT 07/03 RERA"))
+
+    def test_handwritten_corpus(self):
+        decoded = [self.assertSameFields(m) for m in _handwritten_corpus()]
+        self.assertGreater(sum(decoded), len(decoded) * 0.75)
+
+    def test_generated_corpus(self):
+        decoded = [self.assertSameFields(m) for m in _generated_corpus()]
+        self.assertGreater(sum(decoded), 100)
+
+    def test_guess_year_month(self):
+        for metar_raw in itertools.islice(_handwritten_corpus(), 10):
+            self.assertSameFields(metar_raw, year=None, month=None)
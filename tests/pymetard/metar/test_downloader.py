@@ -0,0 +1,149 @@
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from unittest import TestCase
+
+from pymetard import (
+    fetch_stations,
+    load_data_file,
+    AviationWeatherCenterMetarDownloader,
+)
+
+
+def _response(raw_metars, status_code=200, headers=None):
+    res = mock.Mock()
+    res.status_code = status_code
+    res.headers = headers or {}
+    res.text = "".join(f"<code>{r}</code><br/>" for r in raw_metars)
+    return res
+
+
+def _raw_metar(code, observed):
+    return (
+        f"{code} {observed.strftime('%d%H%M')}Z 27010KT 10SM CLR "
+        f"05/M03 A3012 RMK AO2 SLP199"
+    )
+
+
+class TestAviationWeatherCenterMetarDownloader(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+        self.stations = fetch_stations(station_file_path)
+        self.downloader = AviationWeatherCenterMetarDownloader(
+            stations=self.stations,
+            target_dir=self.tmp.name,
+        )
+        self.candidates = list(self.stations.values())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _data_files(self):
+        return sorted(Path(self.tmp.name).glob("**/*.csv"))
+
+    @mock.patch("pymetard.metar.downloader.requests.get")
+    def test_download1_incremental(self, get):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        first = _raw_metar('PCSA', now - timedelta(minutes=50))
+        second = _raw_metar('PCSA', now - timedelta(minutes=10))
+
+        self.assertEqual(
+            self.downloader.incremental_hours(self.candidates, 6),
+            6,
+        )
+        get.return_value = _response([first], headers={'ETag': '"v1"'})
+        self.assertTrue(self.downloader.download1(
+            stations_to_search=self.candidates,
+            hours=6,
+            incremental=True,
+        ))
+        # Only back to the latest observation plus the margin
+        self.assertEqual(
+            self.downloader.incremental_hours(self.candidates, 6),
+            2,
+        )
+
+        get.return_value = _response([first, second])
+        with mock.patch.object(
+            self.downloader,
+            '_fetch_data_from_raw_metar',
+            wraps=self.downloader._fetch_data_from_raw_metar,
+        ) as parse:
+            self.assertTrue(self.downloader.download1(
+                stations_to_search=self.candidates,
+                hours=6,
+                incremental=True,
+            ))
+        parse.assert_called_once_with(second, year=None, month=None)
+        self.assertEqual(
+            get.call_args[1]['headers'],
+            {'If-None-Match': '"v1"'},
+        )
+
+        get.return_value = _response([], status_code=304)
+        self.assertTrue(self.downloader.download1(
+            stations_to_search=self.candidates,
+            hours=6,
+            incremental=True,
+        ))
+        rows = [
+            row
+            for data_file in self._data_files()
+            for row in load_data_file(data_file)
+        ]
+        self.assertEqual([r['rawmetar'] for r in rows], [first, second])
+
+    @mock.patch("pymetard.metar.downloader.requests.get")
+    def test_download1_retry_after_failure(self, get):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        raw_metar = _raw_metar('PCSA', now - timedelta(minutes=10))
+
+        def _get(url, params, headers):
+            if headers.get('If-None-Match') == '"v1"':
+                return _response([], status_code=304)
+            return _response([raw_metar], headers={'ETag': '"v1"'})
+
+        get.side_effect = _get
+        ids = ",".join(s.code4 for s in self.candidates)
+        with mock.patch.object(
+            self.downloader,
+            '_fetch_data_from_raw_metar',
+            side_effect=KeyError("PCSA"),
+        ):
+            self.assertTrue(self.downloader.download1(
+                stations_to_search=self.candidates,
+                hours=6,
+                incremental=True,
+            ))
+        with mock.patch.object(
+            self.downloader,
+            '_dump_data',
+            side_effect=OSError("disk full"),
+        ):
+            with self.assertRaises(OSError):
+                self.downloader.download1(
+                    stations_to_search=self.candidates,
+                    hours=6,
+                    incremental=True,
+                )
+        self.downloader.data = []
+        # Nothing taken as seen, so the retry fetches and parses again
+        self.assertEqual(self.downloader.validators, {})
+        self.assertEqual(self.downloader.last_raw_metars[ids], set())
+        self.assertEqual(self.downloader.high_water_marks, {})
+
+        self.assertTrue(self.downloader.download1(
+            stations_to_search=self.candidates,
+            hours=6,
+            incremental=True,
+        ))
+        rows = [
+            row
+            for data_file in self._data_files()
+            for row in load_data_file(data_file)
+        ]
+        self.assertEqual([r['rawmetar'] for r in rows], [raw_metar])
+        self.assertEqual(len(self.downloader.validators), 1)
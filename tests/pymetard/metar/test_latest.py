@@ -0,0 +1,101 @@
+import json
+import tempfile
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from unittest import TestCase
+
+from pymetard import (
+    fetch_stations,
+    LatestObservations,
+    serve_latest_observations,
+)
+
+
+def _row(code, timestamp, temperature, rawmetar):
+    return {
+        'timestamp': timestamp,
+        'code': code,
+        'temperature_c': temperature,
+        'dewpoint_c': None,
+        'relativehumidity': None,
+        'pressure_mb': 1013.0,
+        'pressuresea_mb': None,
+        'winddirection_deg': 270.0,
+        'windspeed_kt': 10.0,
+        'windgust_kt': None,
+        'rawmetar': rawmetar,
+    }
+
+
+class TestLatestObservations(TestCase):
+    def setUp(self):
+        station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+        self.latest = LatestObservations(fetch_stations(station_file_path))
+        self.latest.update(_row('PCSA', 100.0, 5.0, "PCSA 1"))
+        self.latest.update(_row('PCSA', 200.0, 6.0, "PCSA 2"))
+        self.latest.update(_row('PCSA', 150.0, 7.0, "PCSA 3"))
+        self.latest.update(_row('NWSE', 100.0, 20.0, "NWSE 1"))
+        self.latest.update(_row('XXXX', 100.0, 20.0, "XXXX 1"))
+
+    def test_get(self):
+        observation = self.latest.get('PCSA')
+        self.assertEqual(observation['timestamp'], 200.0)
+        self.assertEqual(observation['temperature_c'], 6.0)
+        self.assertIsNone(observation['dewpoint_c'])
+        self.assertEqual(observation['rawmetar'], "PCSA 2")
+        self.assertIsNone(self.latest.get('APSC'))
+        self.assertIsNone(self.latest.get('XXXX'))
+
+    def test_get_many(self):
+        observations = self.latest.get_many(['PCSA', 'APSC', 'NWSE', 'XXXX'])
+        self.assertEqual([o['code'] for o in observations], ['PCSA', 'NWSE'])
+
+    def test_in_bbox(self):
+        observations = self.latest.in_bbox(-180, 0, 0, 90)
+        self.assertEqual([o['code'] for o in observations], ['PCSA'])
+        observations = self.latest.in_bbox(-180, -90, 180, 90)
+        self.assertEqual(len(observations), 2)
+        with self.assertRaises(ValueError):
+            self.latest.in_bbox(0, 0, -1, -1)
+        for bbox in [
+            (float("-inf"), -90, 180, 90),
+            (-180, float("nan"), 180, 90),
+            (-180, -90, 181, 90),
+        ]:
+            with self.assertRaises(ValueError):
+                self.latest.in_bbox(*bbox)
+        # Many more cells than stations
+        fine = LatestObservations(self.latest.stations, cell_size=0.001)
+        fine.values, fine.raw = self.latest.values, self.latest.raw
+        self.assertEqual(len(fine.in_bbox(-180, -90, 180, 90)), 2)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = Path(tmp) / "latest.npz"
+            self.latest.save(snapshot)
+            station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+            restored = LatestObservations(fetch_stations(station_file_path))
+            restored.load(snapshot)
+        self.assertEqual(restored.get('PCSA'), self.latest.get('PCSA'))
+        self.assertEqual(restored.get('NWSE'), self.latest.get('NWSE'))
+        self.assertIsNone(restored.get('APSC'))
+
+    def test_serve(self):
+        server = serve_latest_observations(self.latest, port=0)
+        host, port = server.server_address[:2]
+        try:
+            with urlopen(f"http://{host}:{port}/latest/pcsa") as res:
+                self.assertEqual(json.load(res)['rawmetar'], "PCSA 2")
+            with urlopen(f"http://{host}:{port}/latest?codes=PCSA,NWSE") as res:
+                self.assertEqual(len(json.load(res)), 2)
+            with urlopen(f"http://{host}:{port}/latest?bbox=-60,-40,-50,-30") as res:
+                self.assertEqual(json.load(res)[0]['code'], 'NWSE')
+            with self.assertRaises(HTTPError) as e:
+                urlopen(f"http://{host}:{port}/latest?bbox=-inf,-90,180,90")
+            self.assertEqual(e.exception.code, 400)
+            e.exception.close()
+        finally:
+            server.shutdown()
+            server.server_close()
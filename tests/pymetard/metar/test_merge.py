@@ -0,0 +1,116 @@
+import tempfile
+from pathlib import Path
+
+from unittest import TestCase
+
+from pymetard import (
+    fetch_stations,
+    load_data_file,
+    merge_data_dirs,
+    normalize_raw_metar,
+    AviationWeatherCenterMetarDownloader,
+)
+from pymetard.metar.merge import merge_data_file
+from pymetard.metar.storage import dump_data_file
+
+
+FIELDS = ['timestamp', 'code', 'temperature_c', 'rawmetar', 'source']
+
+RAW = "PCSA 011251Z 00000KT 10SM CLR 05/M01 A3012"
+
+
+def _row(rawmetar, source, temperature="5.0"):
+    return {
+        'timestamp': "1677675060.0",
+        'code': "PCSA",
+        'temperature_c': temperature,
+        'rawmetar': rawmetar,
+        'source': source,
+    }
+
+
+class TestMerge(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_normalize_raw_metar(self):
+        self.assertEqual(normalize_raw_metar(f" METAR  {RAW}=\n"), RAW)
+        self.assertEqual(normalize_raw_metar(f"SPECI {RAW} ="), RAW)
+        self.assertEqual(normalize_raw_metar(RAW.replace(" ", "\t")), RAW)
+
+    def test_raw_metar_stored_as_is(self):
+        station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+        downloader = AviationWeatherCenterMetarDownloader(
+            stations=fetch_stations(station_file_path),
+            target_dir=self.root,
+        )
+        rows = downloader._fetch_data_from_raw_metars(
+            [f"SPECI {RAW}=", RAW],
+            year=2023,
+            month=3,
+        )
+        self.assertEqual(len(rows), 2)
+        # Report type kept in the stored text, only dedup normalizes
+        self.assertEqual(rows[0]['rawmetar'], f"SPECI {RAW}=")
+        self.assertEqual(downloader._deduplicate_data(rows), rows[:1])
+
+    def test_merge_legacy_file(self):
+        file_path = self.root / "20230301.csv"
+        # Written before the source column existed
+        dump_data_file(
+            [{'timestamp': "1677675060.0", 'code': "PCSA",
+              'temperature_c': "", 'rawmetar': f"{RAW}="}],
+            file_path,
+            fields=FIELDS[:-1],
+        )
+        other = RAW.replace("011251Z", "011351Z")
+        n_rows = merge_data_file(
+            [
+                _row(f"METAR {RAW}", "weathergov"),
+                _row(RAW, "awc"),
+                _row(other, "weathergov"),
+            ],
+            file_path,
+            fields=FIELDS,
+        )
+        self.assertEqual(n_rows, 1)
+        self.assertEqual(
+            load_data_file(file_path),
+            [_row(RAW, "awc"), _row(other, "weathergov")],
+        )
+
+        # Nothing new, same report from a lower priority source
+        content = file_path.read_text()
+        n_rows = merge_data_file(
+            [_row(f"{RAW}=", "weathergov")],
+            file_path,
+            fields=FIELDS,
+        )
+        self.assertEqual(n_rows, 0)
+        self.assertEqual(file_path.read_text(), content)
+
+    def test_merge_data_dirs(self):
+        awc_dir = self.root / "awc"
+        weathergov_dir = self.root / "weathergov"
+        target_dir = self.root / "data"
+        for source_dir, row in [
+            (awc_dir, _row(RAW, "awc", temperature="")),
+            (weathergov_dir, _row(f"METAR {RAW}=", "weathergov")),
+        ]:
+            day_dir = source_dir / "2023" / "03"
+            day_dir.mkdir(parents=True)
+            dump_data_file([row], day_dir / "20230301.csv", FIELDS)
+
+        n_rows = merge_data_dirs(
+            [awc_dir, weathergov_dir],
+            target_dir,
+            fields=FIELDS,
+            compression="gzip",
+        )
+        self.assertEqual(n_rows, 1)
+        rows = load_data_file(target_dir / "2023" / "03" / "20230301.csv.gz")
+        self.assertEqual(rows, [_row(RAW, "awc", temperature="")])
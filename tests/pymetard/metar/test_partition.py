@@ -0,0 +1,165 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from unittest import TestCase
+
+from pymetard import (
+    consolidate_partitions,
+    fetch_stations,
+    load_data_file,
+    MetarCsvDownloader,
+)
+from pymetard.metar.merge import merge_data_file
+from pymetard.metar.partition import (
+    partition_file_path,
+    partition_key,
+    utc_datetime,
+    utc_timestamp,
+)
+from pymetard.metar.storage import append_data_file
+
+
+class TestPartition(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+        self.stations = fetch_stations(station_file_path)
+        # Far from UTC, rows must not move to the neighbouring day
+        self.tz = os.environ.get('TZ')
+        os.environ['TZ'] = "Asia/Shanghai"
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            os.environ.pop('TZ')
+        else:
+            os.environ['TZ'] = self.tz
+        time.tzset()
+        self.tmp.cleanup()
+
+    def _downloader(self, granularity, region=None):
+        return MetarCsvDownloader(
+            stations=self.stations,
+            target_dir=self.root,
+            granularity=granularity,
+            region=region,
+        )
+
+    def _collect(self, downloader, raw_metars):
+        for data in downloader._fetch_data_from_raw_metars(
+            raw_metars,
+            year=2023,
+            month=3,
+        ):
+            downloader._collect_data(data)
+
+    def test_utc(self):
+        observed = datetime(2023, 3, 1, 23, 30)
+        self.assertEqual(utc_timestamp(observed), 1677713400.0)
+        self.assertEqual(utc_datetime(utc_timestamp(observed)), observed)
+        self.assertEqual(partition_key(observed), "20230301")
+        self.assertEqual(
+            partition_file_path(self.root, "2023030123-P"),
+            self.root / "2023" / "03" / "01" / "2023030123-P.csv",
+        )
+        with self.assertRaises(ValueError):
+            partition_file_path(self.root, "202303011")
+
+    def test_hourly_by_region(self):
+        downloader = self._downloader("hourly", region="icao")
+        self._collect(downloader, [
+            "PCSA 012330Z 27010KT 10SM CLR 05/M03 A3012",
+            "APSC 012330Z 27010KT 10SM CLR 05/M03 A3012",
+            "PCSA 020030Z 27010KT 10SM CLR 05/M03 A3012",
+        ])
+        downloader._dump_data()
+        self.assertEqual(
+            sorted(p.relative_to(self.root) for p in self.root.glob("**/*.csv")),
+            [
+                Path("2023/03/01/2023030123-A.csv"),
+                Path("2023/03/01/2023030123-P.csv"),
+                Path("2023/03/02/2023030200-P.csv"),
+            ],
+        )
+
+    def test_consolidate(self):
+        downloader = self._downloader("hourly")
+        self._collect(downloader, [
+            "PCSA 012230Z 27010KT 10SM CLR 05/M03 A3012",
+            "PCSA 012330Z 27010KT 10SM CLR 05/M03 A3012",
+            "PCSA 020030Z 27010KT 10SM CLR 05/M03 A3012",
+        ])
+        downloader._dump_data()
+
+        n_files = consolidate_partitions(
+            self.root,
+            fields=MetarCsvDownloader.FIELDS,
+            from_granularity="hourly",
+            to_granularity="daily",
+            before=datetime(2023, 3, 2, 12),
+        )
+        self.assertEqual(n_files, 2)
+        rows = load_data_file(self.root / "2023" / "03" / "20230301.csv")
+        self.assertEqual(
+            [r['rawmetar'][5:12] for r in rows],
+            ["012230Z", "012330Z"],
+        )
+        # The day in progress is left hot
+        self.assertEqual(
+            sorted(p.name for p in self.root.glob("**/*.csv")),
+            ["20230301.csv", "2023030200.csv"],
+        )
+        with self.assertRaises(ValueError):
+            consolidate_partitions(
+                self.root,
+                fields=MetarCsvDownloader.FIELDS,
+                from_granularity="daily",
+                to_granularity="hourly",
+            )
+
+    def test_consolidate_keeps_changed_files(self):
+        downloader = self._downloader("hourly")
+        self._collect(downloader, [
+            "PCSA 012230Z 27010KT 10SM CLR 05/M03 A3012",
+            "PCSA 012330Z 27010KT 10SM CLR 05/M03 A3012",
+        ])
+        downloader._dump_data()
+        hot_path = self.root / "2023" / "03" / "01" / "2023030123.csv"
+        late = dict(load_data_file(hot_path)[0])
+        late['rawmetar'] = "PCSA 012355Z 27010KT 10SM CLR 05/M03 A3012"
+
+        def merge_and_append(*args, **kwargs):
+            n_rows = merge_data_file(*args, **kwargs)
+            # A late report written by poll while consolidating
+            append_data_file([late], hot_path, MetarCsvDownloader.FIELDS)
+            return n_rows
+
+        with mock.patch(
+            "pymetard.metar.partition.merge_data_file",
+            side_effect=merge_and_append,
+        ):
+            n_files = consolidate_partitions(
+                self.root,
+                fields=MetarCsvDownloader.FIELDS,
+                before=datetime(2023, 3, 2, 12),
+            )
+        self.assertEqual(n_files, 1)
+        self.assertEqual(len(load_data_file(hot_path)), 2)
+
+        # Merged again on the next run, without duplicates
+        consolidate_partitions(
+            self.root,
+            fields=MetarCsvDownloader.FIELDS,
+            before=datetime(2023, 3, 2, 12),
+        )
+        self.assertFalse(hot_path.exists())
+        rows = load_data_file(self.root / "2023" / "03" / "20230301.csv")
+        self.assertEqual(
+            [r['rawmetar'][5:12] for r in rows],
+            ["012230Z", "012330Z", "012355Z"],
+        )
@@ -0,0 +1,134 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+from unittest import TestCase
+
+from pymetard import (
+    fetch_stations,
+    load_data_file,
+    AviationWeatherCenterMetarDownloader,
+    MetarPipeline,
+)
+
+
+def _response(raw_metars):
+    res = mock.Mock()
+    res.status_code = 200
+    res.headers = {}
+    res.text = "".join(f"<code>{r}</code>" for r in raw_metars)
+    return res
+
+
+class TestMetarPipeline(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+        self.stations = fetch_stations(station_file_path)
+        self.downloader = AviationWeatherCenterMetarDownloader(
+            stations=self.stations,
+            target_dir=self.tmp.name,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rows(self):
+        return [
+            row['rawmetar']
+            for data_file in sorted(Path(self.tmp.name).glob("**/*.csv"))
+            for row in load_data_file(data_file)
+        ]
+
+    @mock.patch("pymetard.metar.downloader.requests.get")
+    def test_write_behind(self, get):
+        get.side_effect = lambda url, params, headers: _response([
+            f"{code} 011200Z 27010KT 10SM CLR 05/M03 A3012"
+            for code in params['ids'].split(",")
+        ])
+        with mock.patch.object(
+            self.downloader,
+            '_dump_data',
+            wraps=self.downloader._dump_data,
+        ) as dump:
+            with MetarPipeline(self.downloader, fetchers=2) as pipeline:
+                for station in self.stations.values():
+                    pipeline.submit(stations_to_search=[station], hours=1)
+                pipeline.join()
+                self.assertEqual(dump.call_count, 1)
+                for station in self.stations.values():
+                    pipeline.submit(stations_to_search=[station], hours=1)
+        # Buffered rows are written once more when draining on close
+        self.assertEqual(dump.call_count, 2)
+        self.assertEqual(len(self._rows()), len(self.stations))
+
+    @mock.patch("pymetard.metar.downloader.requests.get")
+    def test_close_stops_retrying(self, get):
+        get.side_effect = requests.exceptions.ConnectionError
+        pipeline = MetarPipeline(self.downloader, retry_interval=60)
+        pipeline.start()
+        pipeline.submit(
+            stations_to_search=list(self.stations.values()),
+            hours=1,
+        )
+        pipeline.close()
+        self.assertEqual(self._rows(), [])
+        with self.assertRaises(RuntimeError):
+            pipeline.submit(stations_to_search=[], hours=1)
+
+    @mock.patch("pymetard.metar.downloader.requests.get")
+    def test_write_failures(self, get):
+        get.side_effect = lambda url, params, headers: _response([
+            f"{code} 011200Z 27010KT 10SM CLR 05/M03 A3012"
+            for code in params['ids'].split(",")
+        ])
+        pipeline = MetarPipeline(self.downloader, max_write_failures=2)
+        pipeline.start()
+        with mock.patch.object(
+            self.downloader,
+            '_collect_data',
+            side_effect=ValueError("bad row"),
+        ) as collect:
+            # Writer thread survives and flush() returns
+            pipeline.submit(
+                stations_to_search=list(self.stations.values()),
+                hours=1,
+            )
+            pipeline.join()
+            self.assertTrue(collect.called)
+            self.assertEqual(self.downloader.data, [])
+        with mock.patch.object(
+            self.downloader,
+            '_dump_data',
+            side_effect=OSError("disk full"),
+        ):
+            pipeline.submit(
+                stations_to_search=list(self.stations.values()),
+                hours=1,
+            )
+            pipeline.join()
+            with self.assertRaises(RuntimeError):
+                pipeline.join()
+            with self.assertRaises(RuntimeError):
+                pipeline.close()
+        self.assertEqual(self._rows(), [])
+
+    @mock.patch("pymetard.metar.downloader.requests.get")
+    def test_bad_report_skips_itself(self, get):
+        good = "PCSA 011200Z 27010KT 10SM CLR 05/M03 A3012"
+        # Not in the station list
+        bad = "ZZZZ 011200Z 27010KT 10SM CLR 05/M03 A3012"
+        get.return_value = _response([bad, good])
+        with MetarPipeline(self.downloader) as pipeline:
+            for _ in range(2):
+                pipeline.submit(
+                    stations_to_search=list(self.stations.values()),
+                    hours=1,
+                    incremental=True,
+                )
+                pipeline.join()
+        self.assertEqual(self._rows(), [good])
+        ids = ",".join(self.stations.keys())
+        self.assertEqual(self.downloader.last_raw_metars[ids], {good})
@@ -0,0 +1,105 @@
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from unittest import TestCase
+
+from pymetard import (
+    fetch_stations,
+    load_data_file,
+    RawResponseArchive,
+    replay_archive,
+)
+from pymetard.metar.storage import dump_data_file
+
+
+class TestReplay(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        station_file_path = Path(__file__).parent / "fixtures" / "fake_stations.txt"
+        self.stations = fetch_stations(station_file_path)
+        self.archive = RawResponseArchive(self.root / "archive")
+        self.archive.save(
+            "awc",
+            {'ids': "PCSA,NWSE", 'hours': 1},
+            "<code>PCSA 282351Z 27010KT 10SM CLR 05/M03 A3012</code>"
+            "<code>NWSE 010051Z 09005KT CAVOK 21/13 Q1013</code>",
+            fetched_at=datetime(2023, 3, 1, 1, 0),
+        )
+        self.archive.save(
+            "weathergov",
+            {'STID': "APSC", 'start': "202302281200", 'end': "202302281300"},
+            json.dumps({'STATION': [
+                {'OBSERVATIONS': {'metar_set_1': [
+                    "APSC 281200Z 18005KT 9999 FEW020 30/24 Q1008",
+                    None,
+                ]}},
+                {'STID': "AISD"},
+            ]}),
+            fetched_at=datetime(2023, 3, 2, 0, 0),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rows(self, target_dir):
+        return {
+            data_file.name: [r['rawmetar'] for r in load_data_file(data_file)]
+            for data_file in sorted(Path(target_dir).glob("**/*.csv"))
+        }
+
+    def test_entries(self):
+        self.assertEqual(len(self.archive.entries()), 2)
+        self.assertEqual(len(self.archive.entries(source="awc")), 1)
+        self.assertEqual(
+            len(self.archive.entries(start=datetime(2023, 3, 1, 12))),
+            1,
+        )
+        entry = self.archive.load(self.archive.entries(source="awc")[0])
+        self.assertEqual(entry['fetched_at'], datetime(2023, 3, 1, 1, 0))
+        self.assertEqual(entry['params'], {'ids': "PCSA,NWSE", 'hours': 1})
+
+    def test_replay_archive(self):
+        for processes in [1, 2]:
+            target_dir = self.root / f"data{processes}"
+            n_rows = replay_archive(
+                self.archive,
+                self.stations,
+                target_dir=target_dir,
+                processes=processes,
+            )
+            self.assertEqual(n_rows, 3)
+            self.assertEqual(self._rows(target_dir), {
+                "20230228.csv": [
+                    "PCSA 282351Z 27010KT 10SM CLR 05/M03 A3012",
+                    "APSC 281200Z 18005KT 9999 FEW020 30/24 Q1008",
+                ],
+                "20230301.csv": [
+                    "NWSE 010051Z 09005KT CAVOK 21/13 Q1013",
+                ],
+            })
+
+    def test_replay_replace(self):
+        target_dir = self.root / "data"
+        replay_archive(self.archive, self.stations, target_dir, processes=1)
+        data_file = target_dir / "2023" / "03" / "20230301.csv"
+        rows = load_data_file(data_file)
+        temperature = rows[0]['temperature_c']
+        # As if stored by an older parser
+        rows[0]['temperature_c'] = "99.0"
+        dump_data_file(rows, data_file, list(rows[0].keys()))
+
+        replay_archive(self.archive, self.stations, target_dir, processes=1)
+        self.assertEqual(load_data_file(data_file)[0]['temperature_c'], "99.0")
+        replay_archive(
+            self.archive,
+            self.stations,
+            target_dir,
+            processes=1,
+            replace=True,
+        )
+        rows = load_data_file(data_file)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['temperature_c'], temperature)
@@ -0,0 +1,81 @@
+import gzip
+import tempfile
+from pathlib import Path
+
+from unittest import TestCase
+
+from pymetard import load_data_file
+from pymetard.metar.storage import (
+    append_data_file,
+    data_file_suffix,
+    dump_data_file,
+    is_gzip_file,
+)
+from pymetard.metar.merge import merge_data_file
+
+
+FIELDS = ['timestamp', 'code', 'rawmetar']
+
+
+class TestStorage(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_data_file_suffix(self):
+        self.assertEqual(data_file_suffix(), ".csv")
+        self.assertEqual(data_file_suffix("gzip"), ".csv.gz")
+        with self.assertRaises(ValueError):
+            data_file_suffix("lzma")
+
+    def test_append_gzip_frames(self):
+        file_path = self.root / "20230301.csv.gz"
+        file_path.touch()
+        rows1 = [{'timestamp': "1", 'code': "PCSA", 'rawmetar': "PCSA 1"}]
+        rows2 = [{'timestamp': "2", 'code': "APSC", 'rawmetar': "APSC 2"}]
+        append_data_file(rows1, file_path, FIELDS, "gzip")
+        append_data_file(rows2, file_path, FIELDS, "gzip")
+
+        self.assertTrue(is_gzip_file(file_path))
+        # Two independent members, header only written in the first one
+        with gzip.open(file_path, 'rt') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "timestamp,code,rawmetar")
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(load_data_file(file_path), rows1 + rows2)
+
+    def test_truncated_gzip_member(self):
+        file_path = self.root / "20230301.csv.gz"
+        rows1 = [{'timestamp': "1", 'code': "PCSA", 'rawmetar': "PCSA 1"}]
+        rows2 = [{'timestamp': "2", 'code': "APSC", 'rawmetar': "APSC 2"}]
+        rows3 = [{'timestamp': "3", 'code': "AISD", 'rawmetar': "AISD 3"}]
+        append_data_file(rows1, file_path, FIELDS, "gzip")
+        size = file_path.stat().st_size
+        append_data_file(rows2, file_path, FIELDS, "gzip")
+        # Crash in the middle of writing the second member
+        with file_path.open('r+b') as f:
+            f.truncate(size + 10)
+
+        self.assertEqual(load_data_file(file_path), rows1)
+        merge_data_file(rows3, file_path, FIELDS, "gzip")
+        with gzip.open(file_path, 'rt') as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+        self.assertEqual(load_data_file(file_path), rows1 + rows3)
+
+    def test_load_plain_and_gzip(self):
+        rows = [{'timestamp': "1", 'code': "PCSA", 'rawmetar': "PCSA 1"}]
+        plain_path = self.root / "20230301.csv"
+        gzip_path = self.root / "20230301.csv.gz"
+        dump_data_file(rows, plain_path, FIELDS)
+        dump_data_file(rows, gzip_path, FIELDS, "gzip")
+
+        self.assertFalse(is_gzip_file(plain_path))
+        self.assertEqual(load_data_file(plain_path), rows)
+        self.assertEqual(load_data_file(gzip_path), rows)
+
+    def test_load_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            load_data_file(self.root / "missing.csv")
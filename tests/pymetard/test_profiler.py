@@ -0,0 +1,80 @@
+import json
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from unittest import TestCase
+
+from pymetard.profiler import Profiler
+
+
+class TestProfiler(TestCase):
+    def test_profile_cycles(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = Profiler(
+                output_dir=tmp_dir,
+                command="poll",
+                params={'argv': ["--profile", "2", "poll"]},
+                cycles=2,
+                sample_interval=0.001,
+            )
+            profiler.start()
+            for _ in range(2):
+                data = [str(i) * 10 for i in range(20000)]
+                sorted(data)
+                profiler.tick()
+            self.assertFalse(profiler.running)
+            self.assertIsNone(profiler.stop())
+
+            save_dirs = list(Path(tmp_dir).glob("poll-*"))
+            self.assertEqual(len(save_dirs), 1)
+            save_dir = save_dirs[0]
+            with (save_dir / "meta.json").open() as f:
+                meta = json.load(f)
+            self.assertEqual(meta['command'], "poll")
+            self.assertEqual(meta['cycles'], 2)
+            self.assertEqual(meta['params']['argv'][0], "--profile")
+            self.assertTrue((save_dir / "profile.pstats").stat().st_size > 0)
+            self.assertTrue((save_dir / "stacks.txt").exists())
+            with (save_dir / "allocations.txt").open() as f:
+                self.assertIn("# Top 50 allocations by line", f.read())
+
+    def test_profile_threads(self):
+        def _worker_stage():
+            sorted(str(i) for i in range(20000))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = Profiler(output_dir=tmp_dir, command="poll", cycles=1)
+            profiler.start()
+            worker = threading.Thread(target=_worker_stage)
+            worker.start()
+            worker.join()
+            profiler.tick()
+            self.assertFalse(profiler.running)
+
+            save_dir, = Path(tmp_dir).glob("poll-*")
+            stats = pstats.Stats(str(save_dir / "profile.pstats"))
+            names = {name for _, _, name in stats.stats.keys()}
+            self.assertIn("_worker_stage", names)
+
+    def test_profile_seconds_without_tick(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = Profiler(
+                output_dir=tmp_dir,
+                command="fill",
+                seconds=0.05,
+                sample_interval=0.001,
+            )
+            profiler.start()
+            deadline = time.time() + 5
+            while profiler.running and time.time() < deadline:
+                time.sleep(0.01)
+            profiler.sampler.join(5)
+            self.assertFalse(profiler.running)
+            self.assertFalse(tracemalloc.is_tracing())
+            self.assertIsNone(profiler.stop())
+            save_dir, = Path(tmp_dir).glob("fill-*")
+            self.assertTrue((save_dir / "profile.pstats").exists())